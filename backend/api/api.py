@@ -1,39 +1,357 @@
+import base64
+import datetime
+import hashlib
+import json
 import logging
+import os
+import time
 
-from flask import Flask, request
+from flask import Flask, Response, abort, request, stream_with_context
+import numpy as np
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
-from services import db, StockDataService
+from services import ChartService, db, response_cache, StockDataService
 
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 
+MAX_PAGE_SIZE = 500
+
+def _encode_cursor(keyset: list) -> str:
+    """Encode the keyset of the last item of a page as an opaque cursor."""
+    raw = json.dumps(keyset)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+def _decode_cursor(cursor: str, types: tuple) -> tuple:
+    """Decode a cursor, converting each keyset value with the matching type."""
+    try:
+        keyset = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        if len(keyset) != len(types):
+            raise ValueError(keyset)
+        return tuple(t(value) for t, value in zip(types, keyset))
+    except Exception:
+        abort(400, description="Invalid cursor")
+
+def _stream_json_array(items, fields):
+    """Yield a JSON array one element at a time, keeping only the given fields."""
+    yield "["
+    for i, item in enumerate(items):
+        if i:
+            yield ","
+        yield app.json.dumps({f: item[f] for f in fields})
+    yield "]"
+
+def _cache_lookup(kind: str, symbol: str):
+    """Look the current request up in the response cache.
+
+    Returns:
+        tuple: (response, key, generation). response is the cached response,
+        or None on a miss, when key and generation are what to store the
+        computed response under. All three are None while caching is off.
+    """
+    if not response_cache.is_active():
+        return None, None, None
+    cache = response_cache.get_response_cache()
+    key = cache.make_key(kind, symbol, request.path, request.args)
+    generation = cache.generation(kind, symbol)
+    entry = cache.get(key)
+    if entry is None:
+        return None, key, generation
+    response = Response(entry.body, mimetype=entry.mimetype, headers=entry.headers)
+    response.headers["X-Cache"] = "HIT"
+    return response, None, None
+
+def _tee_into_cache(chunks, key, generation, mimetype, headers):
+    """Pass chunks through, caching the whole body if the stream completes
+    and stays under the cache's entry size limit."""
+    cache = response_cache.get_response_cache()
+    parts = []
+    size = 0
+    for chunk in chunks:
+        if parts is not None:
+            data = chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+            size += len(data)
+            if size <= cache.max_entry_bytes:
+                parts.append(data)
+            else:
+                parts = None
+        yield chunk
+    if parts is not None:
+        cache.put(key, generation, response_cache.CachedResponse(
+            b"".join(parts), mimetype, headers))
+
+def _iter_article_pages(symbol: str, fields: list, after: tuple=None):
+    """Yield all of a symbol's articles, reading them a page at a time.
+
+    Each page is fetched in full before any of it is sent, so a pooled
+    connection is only held for one query rather than for as long as a
+    slow client takes to receive the whole history. fields must include
+    pr_id and date, which form the keyset.
+    """
+    while True:
+        page = list(db.iter_articles_with_summaries(
+            symbol, fields, limit=MAX_PAGE_SIZE, after=after))
+        yield from page
+        if len(page) < MAX_PAGE_SIZE:
+            return
+        after = (page[-1]["date"], page[-1]["pr_id"])
+
 @app.route("/api/articles/<symbol>", methods=["GET"])
 def get_articles(symbol: str):
     """API endpoint to get articles for a given stock symbol.
 
+    Articles are streamed newest first. Query parameters:
+        fields: comma-separated list of fields to include, e.g.
+            ``fields=pr_id,date,title,sentiment`` to skip the article content
+        limit: page size. when more articles remain, the response carries an
+            ``X-Next-Cursor`` header to pass back as ``cursor``
+        cursor: resume after the last article of the previous page
+
     Args:
         symbol (str): Stock symbol to retrieve articles for.
     """
     logger.info(f"Received request for articles for symbol: {symbol}")
-    titles = db.get_titles_for_symbol(symbol.upper())
-    articles = [
-        db.get_article_with_summary(symbol.upper(), title)
-        for title, _ in titles
-    ]
-    logger.info(f"Returning {len(articles)} articles for symbol: {symbol}")
-    return articles
+    fields = [f for f in request.args.get("fields", "").split(",") if f]
+    fields = fields or list(db.ARTICLE_FIELDS)
+    unknown = [f for f in fields if f not in db.ARTICLE_FIELDS]
+    if unknown:
+        abort(400, description=f"Unknown fields: {', '.join(unknown)}")
+    # the keyset columns are always selected so the next cursor can be built
+    query_fields = list(dict.fromkeys(fields + ["pr_id", "date"]))
+
+    limit = request.args.get("limit", type=int)
+    cursor = request.args.get("cursor")
+    after = _decode_cursor(cursor, (datetime.date.fromisoformat, int)) if cursor else None
+    cached, cache_key, generation = _cache_lookup("articles", symbol.upper())
+    if cached is not None:
+        return cached
+    headers = {}
+    if limit is None:
+        articles = _iter_article_pages(symbol.upper(), query_fields, after)
+    else:
+        limit = max(1, min(limit, MAX_PAGE_SIZE))
+        # fetch one extra row to learn whether another page exists
+        articles = list(db.iter_articles_with_summaries(
+            symbol.upper(), query_fields, limit=limit + 1, after=after))
+        if len(articles) > limit:
+            articles = articles[:limit]
+            headers["X-Next-Cursor"] = _encode_cursor(
+                [str(articles[-1]["date"]), articles[-1]["pr_id"]])
+        logger.info(f"Returning {len(articles)} articles for symbol: {symbol}")
+    body = _stream_json_array(articles, fields)
+    if cache_key is not None:
+        body = _tee_into_cache(body, cache_key, generation, "application/json", headers)
+    return Response(
+        stream_with_context(body),
+        mimetype="application/json",
+        headers=headers,
+    )
+
+MAX_SEARCH_PAGE_SIZE = 100
+
+def _date_arg(name: str):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        abort(400, description=f"{name} must be an ISO date")
+
+@app.route("/api/search", methods=["GET"])
+def search_articles():
+    """API endpoint for full-text search of articles.
+
+    Query parameters:
+        q: search terms in web search syntax, e.g. ``"phase 3" topline``
+        symbol: only search this symbol's articles
+        from, to: ISO dates bounding the article date (inclusive)
+        limit: page size (default 20, at most 100). when more results
+            remain, the response carries an ``X-Next-Cursor`` header to pass
+            back as ``cursor``
+        cursor: resume after the last result of the previous page
+
+    Results are ranked best first, each with a snippet of the content
+    with the matched terms wrapped in <mark> tags.
+    """
+    query = request.args.get("q", "").strip()
+    if not query:
+        abort(400, description="q is required")
+    symbol = request.args.get("symbol")
+    limit = max(1, min(request.args.get("limit", 20, type=int), MAX_SEARCH_PAGE_SIZE))
+    cursor = request.args.get("cursor")
+    logger.info(f"Received search request for {query!r}")
+    results = db.search_articles(
+        query,
+        symbol=symbol.upper() if symbol else None,
+        start=_date_arg("from"),
+        end=_date_arg("to"),
+        limit=limit + 1,
+        after=_decode_cursor(cursor, (float, int)) if cursor else None,
+    )
+    headers = {}
+    if len(results) > limit:
+        results = results[:limit]
+        headers["X-Next-Cursor"] = _encode_cursor([results[-1]["rank"], results[-1]["pr_id"]])
+    logger.info(f"Returning {len(results)} search results for {query!r}")
+    return Response(app.json.dumps(results), mimetype="application/json", headers=headers)
+
+@app.route("/api/catalysts/<symbol>", methods=["GET"])
+def get_catalysts(symbol: str):
+    """API endpoint to get a symbol's news days for catalyst overlays.
+
+    Each day has its article count, positive/negative/neutral sentiment
+    counts, summary categories and titles. Query parameters:
+        from, to: ISO dates bounding the days returned (inclusive)
+
+    Args:
+        symbol (str): Stock symbol to retrieve catalysts for.
+    """
+    logger.info(f"Received request for catalysts for symbol: {symbol}")
+    start, end = _date_arg("from"), _date_arg("to")
+    # the rollup changes exactly when articles or summaries are saved
+    cached, cache_key, generation = _cache_lookup("articles", symbol.upper())
+    if cached is not None:
+        return cached
+    catalysts = db.get_catalysts(symbol.upper(), start, end)
+    body = app.json.dumps(catalysts).encode("utf-8")
+    if cache_key is not None:
+        response_cache.get_response_cache().put(
+            cache_key, generation,
+            response_cache.CachedResponse(body, "application/json"))
+    logger.info(f"Returning {len(catalysts)} catalyst days for symbol: {symbol}")
+    return Response(body, mimetype="application/json")
+
+PRICE_INTERVALS = {
+    "1d": None,
+    "1wk": {"rule": "W-MON", "label": "left", "closed": "left"},
+    "1mo": {"rule": "MS"},
+}
+PRICE_AGGREGATION = {"Open": "first", "High": "max", "Low": "min",
+                     "Close": "last", "Volume": "sum"}
+
+def _dumps(obj) -> bytes:
+    """Serialize to compact JSON, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+def _columnar(df, float32: bool) -> dict:
+    """Convert a price frame to one array per field, with dates as days
+    since the Unix epoch."""
+    dtype = np.float32 if float32 else np.float64
+    columns = {"date": df.index.values.astype("datetime64[D]").astype(np.int64)}
+    for field in ("Open", "High", "Low", "Close"):
+        # one contiguous array per column; orjson rejects strided slices
+        values = np.ascontiguousarray(df[field].to_numpy(dtype=np.float64), dtype=dtype)
+        if float32 and orjson is None:
+            # json would write the float32 values out at full float64 length
+            values = np.round(values.astype(np.float64), 4)
+        columns[field.lower()] = values
+    columns["volume"] = df["Volume"].fillna(0).to_numpy(dtype=np.int64)
+    if orjson is None:
+        columns = {k: v.tolist() for k, v in columns.items()}
+    return columns
 
 @app.route("/api/price-history/<symbol>", methods=["GET"])
 def get_price_history(symbol: str):
     """API endpoint to get price history for a given stock symbol.
 
+    Query parameters:
+        start, end: ISO dates bounding the bars returned (inclusive)
+        interval: 1d (default), 1wk or 1mo
+        format: records (default), one object per bar, or columnar, one
+            array per field with dates as days since the Unix epoch
+        precision: float32 to send prices at single precision (columnar)
+
+    Responses carry an ETag and Cache-Control, so a client revalidating
+    unchanged data gets 304 Not Modified.
+
     Args:
         symbol (str): Stock symbol to retrieve price history for.
     """
     logger.info(f"Received request for price history for symbol: {symbol}")
+    interval = request.args.get("interval", "1d")
+    if interval not in PRICE_INTERVALS:
+        abort(400, description=f"Unsupported interval: {interval}")
+    response_format = request.args.get("format", "records")
+    if response_format not in ("records", "columnar"):
+        abort(400, description=f"Unsupported format: {response_format}")
+    cached, cache_key, generation = _cache_lookup("prices", symbol.upper())
+    if cached is not None:
+        return cached.make_conditional(request)
+
     price_history = StockDataService.fetch_price_history(symbol.upper())
-    df = price_history[symbol.upper()].reset_index()
-    df['Date'] = df['Date'].dt.strftime('%Y-%m-%d')
+    df = price_history[symbol.upper()]
+    try:
+        df = df.loc[request.args.get("start"):request.args.get("end")]
+    except (ValueError, TypeError, KeyError):
+        abort(400, description="start and end must be ISO dates")
+    if PRICE_INTERVALS[interval]:
+        resample = dict(PRICE_INTERVALS[interval])
+        df = (df.resample(resample.pop("rule"), **resample)
+              .agg(PRICE_AGGREGATION).dropna(subset=["Close"]))
+
+    if response_format == "columnar":
+        body = _dumps({
+            "symbol": symbol.upper(),
+            "interval": interval,
+            **_columnar(df, request.args.get("precision") == "float32"),
+        })
+    else:
+        records = df.reset_index()
+        records['Date'] = records['Date'].dt.strftime('%Y-%m-%d')
+        body = _dumps(records.to_dict(orient="records"))
     logger.info(f"Returning {len(df)} price history records for symbol: {symbol}")
-    return df.to_dict(orient="records")
\ No newline at end of file
+
+    max_age = int(os.getenv("PRICE_HISTORY_MAX_AGE", "300"))
+    response = Response(body, mimetype="application/json")
+    response.set_etag(hashlib.sha1(body).hexdigest())
+    response.cache_control.public = True
+    response.cache_control.max_age = max_age
+    if cache_key is not None:
+        # bars are refreshed from upstream on a miss, so don't outlive max_age
+        headers = {h: response.headers[h] for h in ("ETag", "Cache-Control")}
+        response_cache.get_response_cache().put(
+            cache_key, generation,
+            response_cache.CachedResponse(body, "application/json", headers,
+                                          expires_at=time.monotonic() + max_age))
+    return response.make_conditional(request)
+
+@app.route("/api/chart/<symbol>.<fmt>", methods=["GET"])
+def get_chart(symbol: str, fmt: str):
+    """API endpoint rendering a symbol's candlestick chart with catalyst
+    days, as PNG (``/api/chart/ABC.png``) or SVG (``/api/chart/ABC.svg``).
+
+    The image is only re-rendered when the bars, articles or summaries
+    change, and carries an ETag derived from them, so unchanged charts
+    revalidate to 304 Not Modified.
+
+    Args:
+        symbol (str): Stock symbol to chart.
+        fmt (str): png or svg.
+    """
+    if fmt not in ChartService.FORMATS:
+        abort(404)
+    logger.info(f"Received request for {fmt} chart for symbol: {symbol}")
+    image, key, from_cache = ChartService.get_chart(symbol.upper(), fmt)
+    if image is None:
+        abort(404, description=f"No price history for {symbol}")
+    response = Response(image, mimetype=ChartService.FORMATS[fmt])
+    response.set_etag(hashlib.sha1(repr(key).encode()).hexdigest())
+    response.cache_control.public = True
+    response.cache_control.max_age = int(os.getenv("CHART_MAX_AGE", "300"))
+    if from_cache:
+        response.headers["X-Cache"] = "HIT"
+    return response.make_conditional(request)
+
+@app.route("/api/stats/cache", methods=["GET"])
+def get_cache_stats():
+    """API endpoint reporting response cache hit ratio, evictions and size."""
+    stats = response_cache.get_stats()
+    stats["charts"] = ChartService.get_chart_cache().stats()
+    return stats
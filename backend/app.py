@@ -6,7 +6,7 @@ import os
 
 from dotenv import load_dotenv
 
-from services import MonitoringService, NewsAnalysisService
+from services import MonitoringService, NewsAnalysisService, StockDataService
 
 load_dotenv()
 
@@ -63,10 +63,11 @@ def start():
     logger.info("Starting PharmaWatch")
 
     logger.info("Firing up ThreadPoolExecutor and scheduling jobs")
-    executor = ThreadPoolExecutor(max_workers=3)
+    executor = ThreadPoolExecutor(max_workers=4)
     executor.submit(NewsAnalysisService.start)
     executor.submit(NewsAnalysisService.queue_unsummarized_articles)
     executor.submit(MonitoringService.start)
+    executor.submit(StockDataService.start)
 
     # wait til jobs are done, which will never happen since they're infinite loops :)
     executor.shutdown(wait=True)
@@ -0,0 +1,102 @@
+"""Benchmark server-side chart rendering.
+
+Renders a synthetic year of bars with catalyst days through
+services.ChartService in each format, and through ui.PriceNewsPlot's
+pyplot bar calls for comparison. It then serves the same chart twice from
+get_chart to show the second request does not re-render. Run from the
+backend directory:
+
+    python -m benchmarks.bench_chart_render
+    python -m benchmarks.bench_chart_render --days 1260 --repeat 10
+"""
+import argparse
+import io
+import time
+from unittest import mock
+
+import matplotlib
+matplotlib.use("Agg")
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from services import ChartService
+from ui import PriceNewsPlot
+
+def synthetic_data(days: int, catalyst_days: int, seed: int=0):
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=days, name="Date")
+    close = 20 * np.exp(np.cumsum(rng.normal(0, 0.02, days)))
+    open_ = close * np.exp(rng.normal(0, 0.01, days))
+    spread = np.abs(rng.normal(0, 0.01, days))
+    prices = pd.DataFrame({
+        "Open": open_,
+        "High": np.maximum(open_, close) * (1 + spread),
+        "Low": np.minimum(open_, close) * (1 - spread),
+        "Close": close,
+        "Volume": rng.lognormal(13, 0.5, days).round(),
+    }, index=dates)
+    news = np.sort(rng.choice(dates, min(catalyst_days, days), replace=False))
+    catalysts = pd.DataFrame({
+        "positive_count": rng.integers(0, 2, len(news)),
+        "negative_count": rng.integers(0, 2, len(news)),
+    }, index=pd.DatetimeIndex(news))
+    return prices, catalysts
+
+def render_pyplot(prices: pd.DataFrame, catalysts: pd.DataFrame) -> bytes:
+    """The chart as PriceNewsPlot draws it, saved instead of shown."""
+    data = prices.assign(Catalyst=prices.index.isin(catalysts.index))
+    plt.figure(figsize=(12, 6), dpi=100)
+    PriceNewsPlot.plot_price_history(data)
+    PriceNewsPlot.plot_volume_history(data)
+    with mock.patch("builtins.print"):
+        PriceNewsPlot.plot_catalyst_dates(data, catalysts=catalysts)
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format="png")
+    plt.close()
+    return buffer.getvalue()
+
+def timed(label: str, repeat: int, render) -> float:
+    started = time.perf_counter()
+    for _ in range(repeat):
+        image = render()
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"{label}: {elapsed * 1000:.1f}ms per render ({len(image):,} bytes)")
+    return elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--days", type=int, default=252)
+    parser.add_argument("--catalysts", type=int, default=40)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    prices, catalysts = synthetic_data(args.days, args.catalysts)
+    print(f"{len(prices)} bars, {len(catalysts)} catalyst days")
+
+    collections = timed("ChartService png", args.repeat,
+                        lambda: ChartService.render_chart("TEST", prices, catalysts, "png"))
+    timed("ChartService svg", args.repeat,
+          lambda: ChartService.render_chart("TEST", prices, catalysts, "svg"))
+    bars = timed("PriceNewsPlot png", args.repeat, lambda: render_pyplot(prices, catalysts))
+    print(f"collections are {bars / collections:.1f}x faster than pyplot bars")
+
+    rows = [{"date": d.date(), "positive_count": int(p), "negative_count": int(n)}
+            for d, p, n in catalysts.itertuples()]
+    with mock.patch.object(ChartService.StockDataService, "get_price_frames",
+                           return_value={"TEST": prices}), \
+            mock.patch.object(ChartService.db, "get_latest_article_ids",
+                              return_value=(1, 1)), \
+            mock.patch.object(ChartService.db, "get_catalysts", return_value=rows), \
+            mock.patch.object(ChartService, "render_chart",
+                              wraps=ChartService.render_chart) as render:
+        for request in ("first", "repeat"):
+            started = time.perf_counter()
+            _, _, from_cache = ChartService.get_chart("TEST", "png")
+            elapsed = time.perf_counter() - started
+            print(f"get_chart {request} request: {elapsed * 1000:.1f}ms, "
+                  f"from cache: {from_cache}")
+        print(f"renders for two requests: {render.call_count}")
+
+if __name__ == "__main__":
+    main()
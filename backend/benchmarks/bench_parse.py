@@ -0,0 +1,82 @@
+"""Benchmark listing page parsing over saved fixture pages.
+
+Compares the old BeautifulSoup -> str -> lxml path against parsing the
+response bytes directly with lxml, for every site in monitoring.yaml that
+has a saved fixture. Run from the backend directory:
+
+    python -m benchmarks.bench_parse --save-fixtures   # fetch pages once
+    python -m benchmarks.bench_parse -n 20
+
+Fixtures are live copies of third-party pages saved to
+benchmarks/fixtures/, which is git-ignored. They are not committed, so
+to compare runs over time, keep the same fixture directory rather than
+re-fetching between runs.
+"""
+import argparse
+import os
+import time
+
+from monitors import MonitorBase
+from monitors.parsing import parse_html, parse_html_soup
+from services import http_client, MonitoringService
+
+FIXTURE_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+def fixture_path(symbol: str) -> str:
+    return os.path.join(FIXTURE_DIR, f"{symbol.lower()}.html")
+
+def save_fixtures(config):
+    os.makedirs(FIXTURE_DIR, exist_ok=True)
+    for symbol, company in config.get("company", {}).items():
+        url = company.get("press_releases", {}).get("url")
+        if not url:
+            continue
+        try:
+            resp = http_client.get(url)
+            resp.raise_for_status()
+        except Exception as e:
+            print(f"{symbol}: failed to fetch {url}: {e}")
+            continue
+        with open(fixture_path(symbol), "wb") as f:
+            f.write(resp.content)
+        print(f"{symbol}: saved {len(resp.content)} bytes")
+
+def time_parser(parse, content, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        dom = parse(content)
+    return (time.perf_counter() - started) / iterations, dom
+
+def run(config, iterations):
+    print(f"{'symbol':<8}{'bytes':>10}{'soup ms':>10}{'lxml ms':>10}"
+          f"{'speedup':>9}{'articles':>10}")
+    found = 0
+    for symbol, company in sorted(config.get("company", {}).items()):
+        path = fixture_path(symbol)
+        if not os.path.exists(path):
+            continue
+        found += 1
+        with open(path, "rb") as f:
+            content = f.read()
+        soup_time, soup_dom = time_parser(parse_html_soup, content, iterations)
+        lxml_time, lxml_dom = time_parser(parse_html, content, iterations)
+        monitor = MonitorBase(symbol, company.get("press_releases", {}))
+        found_soup = len(monitor._find_articles_lxml(soup_dom))
+        found_lxml = len(monitor._find_articles_lxml(lxml_dom))
+        articles = (str(found_lxml) if found_soup == found_lxml
+                    else f"{found_lxml}!={found_soup}")
+        print(f"{symbol:<8}{len(content):>10}{soup_time * 1000:>10.2f}"
+              f"{lxml_time * 1000:>10.2f}{soup_time / lxml_time:>8.1f}x{articles:>10}")
+    if not found:
+        print(f"No fixtures in {FIXTURE_DIR}; run with --save-fixtures first")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--iterations", type=int, default=10)
+    parser.add_argument("--save-fixtures", action="store_true",
+                        help="download each configured listing page first")
+    args = parser.parse_args()
+    config = MonitoringService.load_config()
+    if args.save_fixtures:
+        save_fixtures(config)
+    run(config, args.iterations)
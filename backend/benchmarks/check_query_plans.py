@@ -0,0 +1,151 @@
+"""Check that the read queries in services/db.py are served by indexes.
+
+Runs each db read function against the configured database with a
+connection that records the SQL it sends, then EXPLAINs every recorded
+query and fails if one of INDEXED_TABLES is read with a sequential scan
+where an index should serve.
+Sequential scans are disabled while planning, since on a small development
+database the planner rightly prefers them. The plan shows whether a usable
+index exists, not what production will choose. Run from the backend
+directory after applying migrations:
+
+    python -m benchmarks.check_query_plans
+    python -m benchmarks.check_query_plans -v   # print every plan
+"""
+import argparse
+import datetime
+import json
+import re
+import sys
+
+from dotenv import load_dotenv
+import psycopg2
+from psycopg2.extras import LoggingConnection
+
+from services import db
+from services.db_pool import ConnectionPool
+
+INDEXED_TABLES = {"press_release", "pr_summary", "summary_queue", "price_history",
+                  "catalyst_daily"}
+SCAN_NODES = {"Seq Scan", "Index Scan", "Index Only Scan", "Bitmap Heap Scan"}
+_DECLARE = re.compile(r"^\s*DECLARE\s+\"?\w+\"?\s+CURSOR\s+.*?\bFOR\s+", re.I | re.S)
+
+
+class RecordingConnection(LoggingConnection):
+    """Connection that keeps the SQL of every statement it executes."""
+
+    def initialize(self, queries: list):
+        super().initialize(sys.stderr)
+        self.queries = queries
+
+    def filter(self, msg, curs):
+        if isinstance(msg, bytes):
+            msg = msg.decode("utf-8", "replace")
+        self.queries.append(_DECLARE.sub("", msg))
+        return None
+
+
+def sample_arguments(cursor) -> dict:
+    """Pick a real symbol, title, article and hash so the plans are realistic."""
+    cursor.execute("""
+        SELECT pr.id, pr.symbol, pr.title, pr.date, ps.content_hash
+        FROM investing.press_release pr
+        LEFT JOIN investing.pr_summary ps ON ps.pr_id = pr.id
+        LIMIT 1;
+    """)
+    row = cursor.fetchone() or (1, "AAPL", "title", datetime.date.today(), None)
+    return {"id": row[0], "symbol": row[1], "title": row[2], "date": row[3],
+            "hash": row[4] or "0" * 64}
+
+def checks(args: dict) -> list:
+    """(name, call, tables a sequential scan is expected on) per db read."""
+    def first(generator):
+        # close right away so the single pooled connection is handed back
+        try:
+            return next(generator, None)
+        finally:
+            generator.close()
+    return [
+        ("get_article by id", lambda: db.get_article(args["id"]), set()),
+        ("get_article by title",
+         lambda: db.get_article(args["symbol"], args["title"]), set()),
+        ("get_article_with_summary by id",
+         lambda: db.get_article_with_summary(args["id"]), set()),
+        ("get_article_with_summary by title",
+         lambda: db.get_article_with_summary(args["symbol"], args["title"]), set()),
+        ("iter_articles_with_summaries",
+         lambda: first(db.iter_articles_with_summaries(args["symbol"], limit=50)), set()),
+        ("iter_articles_with_summaries after cursor",
+         lambda: first(db.iter_articles_with_summaries(
+             args["symbol"], limit=50, after=(args["date"], args["id"]))), set()),
+        ("get_catalysts", lambda: db.get_catalysts(args["symbol"]), set()),
+        ("get_catalyst_days", lambda: db.get_catalyst_days([args["symbol"]]), set()),
+        ("get_latest_article_ids", lambda: db.get_latest_article_ids(args["symbol"]), set()),
+        ("get_titles_for_symbol", lambda: db.get_titles_for_symbol(args["symbol"]), set()),
+        # every article is a candidate, so press_release is read in full
+        ("get_unsummarized_articles",
+         lambda: first(db.get_unsummarized_articles(include_content=False)),
+         {"press_release"}),
+        ("search_articles", lambda: db.search_articles("phase 3 topline"), set()),
+        ("search_articles for symbol",
+         lambda: db.search_articles("phase 3 topline", symbol=args["symbol"]), set()),
+        ("find_summary_by_hash", lambda: db.find_summary_by_hash(args["hash"]), set()),
+        ("get_summary_queue_depth", db.get_summary_queue_depth, {"summary_queue"}),
+        ("get_price_history",
+         lambda: db.get_price_history([args["symbol"]], args["date"]), set()),
+        ("get_price_extents", lambda: db.get_price_extents([args["symbol"]]), set()),
+    ]
+
+def scans(plan: dict):
+    """Yield (node type, table, index) for every scan in a JSON plan."""
+    if plan.get("Node Type") in SCAN_NODES:
+        yield plan["Node Type"], plan.get("Relation Name"), plan.get("Index Name")
+    for child in plan.get("Plans", []):
+        yield from scans(child)
+
+def main():
+    load_dotenv()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-v", "--verbose", action="store_true", help="print every plan")
+    options = parser.parse_args()
+
+    recorded = []
+    def connect():
+        conn = psycopg2.connect(connection_factory=RecordingConnection,
+                                **db.get_connection_info())
+        conn.initialize(recorded)
+        return conn
+    db._pool = ConnectionPool(connect, min_size=1, max_size=1)
+
+    explainer = db.get_connection()
+    failures = 0
+    with explainer.cursor() as cursor:
+        cursor.execute("SET enable_seqscan = off;")
+        args = sample_arguments(cursor)
+        for name, call, seq_scan_expected in checks(args):
+            del recorded[:]
+            call()
+            queries = [q for q in recorded
+                       if q.lstrip().upper().startswith("SELECT") and "investing." in q]
+            for query in queries:
+                cursor.execute("EXPLAIN (FORMAT JSON) " + query)
+                plan = cursor.fetchone()[0]
+                plan = (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+                bad = [(node, table) for node, table, _ in scans(plan)
+                       if node == "Seq Scan" and table in INDEXED_TABLES
+                       and table not in seq_scan_expected]
+                used = sorted({index for _, _, index in scans(plan) if index})
+                failures += bool(bad)
+                print(f"{'FAIL' if bad else 'ok':<4}  {name}: "
+                      + (f"sequential scan of {', '.join(t for _, t in bad)}" if bad
+                         else f"indexes {', '.join(used) or '(none)'}"))
+                if options.verbose:
+                    print(json.dumps(plan, indent=2, default=str))
+    explainer.close()
+    db._pool.close()
+    if failures:
+        print(f"{failures} queries are not served by an index")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
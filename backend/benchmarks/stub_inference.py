@@ -0,0 +1,195 @@
+"""Local stub of the inference server for exercising the summarizer.
+
+Replies in the same shape as the real server: JSON summaries for prompts
+built from PROMPT_TEMPLATE (or arrays for batch prompts) and plain text for
+chunk prompts. Run from the backend directory:
+
+    python -m benchmarks.stub_inference --port 8099
+    python -m benchmarks.stub_inference --summarize filing.md
+    python -m benchmarks.stub_inference --check
+
+--check runs the summarizer over a synthetic filing and a batch of short
+releases and exits non-zero if the calls made or the results are wrong.
+"""
+import argparse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import re
+import sys
+import threading
+import time
+
+from services import chunking, NewsAnalysisService
+
+MODEL = "stub-model"
+
+def _reply_for(prompt: str) -> str:
+    first_line = next((l.strip() for l in prompt.splitlines() if l.strip()), "")
+    summary = {"summary": first_line[:200], "subject": "Other", "sentiment": "Neutral"}
+    if "respond with a JSON array" in prompt:
+        count = int(re.search(r"each of the preceeding (\d+) articles", prompt).group(1))
+        return json.dumps([summary] * count)
+    if "JSON format" in prompt:
+        return json.dumps(summary)
+    return first_line[:200]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    calls = 0
+    prompt_chars = 0
+    prompts = []
+    lock = threading.Lock()
+
+    @classmethod
+    def reset(cls):
+        with cls.lock:
+            cls.calls = 0
+            cls.prompt_chars = 0
+            cls.prompts = []
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = body["messages"][-1]["content"]
+        with StubHandler.lock:
+            StubHandler.calls += 1
+            StubHandler.prompt_chars += len(prompt)
+            StubHandler.prompts.append(prompt)
+        payload = json.dumps({
+            "model": MODEL,
+            "reply": {"role": "assistant", "content": _reply_for(prompt)},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+def serve(port: int) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def summarize_file(path: str, port: int):
+    """Summarize a markdown file against the stub and report the calls made."""
+    server = serve(port)
+    os.environ["INFERENCE_URL"] = f"http://127.0.0.1:{server.server_port}/"
+    with open(path, "r", encoding="utf-8") as f:
+        article = {"title": os.path.basename(path), "content": f.read()}
+    started = time.perf_counter()
+    result = NewsAnalysisService.summarize_article(article)
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+    print(json.dumps(result, indent=2))
+    print(f"{StubHandler.calls} inference calls, {StubHandler.prompt_chars} prompt "
+          f"characters (input {len(article['content'])}), {elapsed:.2f}s")
+
+HEADER = "Acme Therapeutics, Inc. | Quarterly Report"
+BOILERPLATE_MARKERS = ("SAFE-HARBOR-TEXT", "IR-CONTACT-TEXT", HEADER)
+
+def synthetic_filing(pages: int=60, paragraphs: int=8) -> tuple:
+    """A long markdown filing with running headers, page numbers and legal
+    sections. Every body paragraph carries a FACT-<page>-<n> marker.
+
+    Returns:
+        tuple: (markdown, list of fact markers)
+    """
+    facts = []
+    lines = ["# Acme Therapeutics Reports Third Quarter Results", ""]
+    for page in range(1, pages + 1):
+        lines += [HEADER, ""]
+        for n in range(paragraphs):
+            fact = f"FACT-{page}-{n}"
+            facts.append(fact)
+            lines += [f"{fact} " + "Enrollment in the phase 2 study continued "
+                      "and the company reported cash of $120 million. " * 8, ""]
+        lines += [f"Page {page} of {pages}", "", "-----", ""]
+    lines += ["## Forward-Looking Statements", "",
+              "SAFE-HARBOR-TEXT " + "Actual results may differ materially. " * 40, "",
+              "## Investor Contacts", "", "IR-CONTACT-TEXT ir@acme.example", ""]
+    return "\n".join(lines), facts
+
+def check(port: int) -> list:
+    """Summarize synthetic articles against the stub and check the calls
+    made and the results returned.
+
+    Returns:
+        list: descriptions of the failed checks
+    """
+    failures = []
+    def expect(condition, description):
+        if not condition:
+            failures.append(description)
+
+    server = serve(port)
+    os.environ["INFERENCE_URL"] = f"http://127.0.0.1:{server.server_port}/"
+    os.environ["INFERENCE_RETRIES"] = "0"
+    try:
+        content, facts = synthetic_filing()
+        budget = NewsAnalysisService._chunk_tokens()
+        expected_chunks = len(chunking.split_chunks(chunking.strip_boilerplate(content), budget))
+        StubHandler.reset()
+        result = NewsAnalysisService.summarize_article({"title": "filing", "content": content})
+        chunk_prompts = [p for p in StubHandler.prompts if "JSON format" not in p]
+        final_prompts = [p for p in StubHandler.prompts if "JSON format" in p]
+        print(f"long filing: {len(content):,} characters, {StubHandler.calls} calls")
+        expect(expected_chunks > 1, f"filing fits one prompt of {budget} tokens")
+        expect(len(chunk_prompts) == expected_chunks,
+               f"{len(chunk_prompts)} chunk calls, expected {expected_chunks}")
+        expect(len(final_prompts) == 1, f"{len(final_prompts)} reduce calls, expected 1")
+        expect(all(p.startswith(NewsAnalysisService.REDUCE_PREAMBLE) for p in final_prompts),
+               "reduce prompt is not built from the partial summaries")
+        for fact in facts:
+            found = sum(fact + " " in p for p in chunk_prompts)
+            if found != 1:
+                expect(False, f"{fact} is in {found} chunk prompts, expected 1")
+                break
+        for marker in BOILERPLATE_MARKERS:
+            expect(not any(marker in p for p in StubHandler.prompts),
+                   f"boilerplate {marker!r} was sent for inference")
+        expect(not any(re.search(r"^Page \d+ of", p, re.M) for p in StubHandler.prompts),
+               "page numbers were sent for inference")
+        expect(set(result) == {"summary", "category", "sentiment", "model", "prompt"},
+               f"unexpected result keys {sorted(result)}")
+        expect(result["model"] == MODEL, f"model {result['model']!r}, expected {MODEL!r}")
+        expect(result["prompt"].get("chunks") == expected_chunks,
+               f"result records {result['prompt'].get('chunks')} chunks, "
+               f"expected {expected_chunks}")
+
+        articles = [{"title": f"release {i}", "content": f"Release {i} announces results."}
+                    for i in range(3)]
+        StubHandler.reset()
+        results = NewsAnalysisService.summarize_articles(articles)
+        print(f"short releases: {len(articles)} articles, {StubHandler.calls} calls")
+        expect(StubHandler.calls == 1,
+               f"{StubHandler.calls} calls for {len(articles)} short articles, expected 1")
+        expect(len(results) == len(articles) and all(
+                   r and r["model"] == MODEL and r["sentiment"] for r in results),
+               "batch results missing or malformed")
+    finally:
+        server.shutdown()
+    return failures
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--summarize", metavar="MARKDOWN_FILE",
+                        help="summarize a file against the stub and exit")
+    parser.add_argument("--check", action="store_true",
+                        help="check the summarizer against the stub and exit")
+    args = parser.parse_args()
+    if args.check:
+        failures = check(args.port)
+        for failure in failures:
+            print(f"FAIL: {failure}")
+        print("FAILED" if failures else "OK")
+        sys.exit(1 if failures else 0)
+    elif args.summarize:
+        summarize_file(args.summarize, args.port)
+    else:
+        server = serve(args.port)
+        print(f"Stub inference server listening on port {server.server_port}")
+        threading.Event().wait()
@@ -0,0 +1,31 @@
+-- Tables the services were originally written against. IF NOT EXISTS lets
+-- this adopt databases created by hand before migrations existed.
+CREATE SCHEMA IF NOT EXISTS investing;
+
+CREATE TABLE IF NOT EXISTS investing.watchlist (
+    symbol text PRIMARY KEY,
+    active boolean NOT NULL DEFAULT true
+);
+
+CREATE TABLE IF NOT EXISTS investing.press_release (
+    id integer GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    symbol text NOT NULL,
+    date date NOT NULL,
+    title text NOT NULL,
+    content_type text,
+    content text,
+    url text,
+    retrieved_ts timestamptz
+);
+
+CREATE TABLE IF NOT EXISTS investing.pr_summary (
+    id integer GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+    pr_id integer NOT NULL
+        REFERENCES investing.press_release (id) ON DELETE CASCADE,
+    category text,
+    sentiment text,
+    summary text,
+    timestamp timestamptz NOT NULL DEFAULT now(),
+    model_used text,
+    prompt jsonb
+);
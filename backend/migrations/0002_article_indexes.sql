@@ -0,0 +1,23 @@
+-- Indexes for the access paths in services/db.py:
+--   * a symbol's articles newest first, paged by the (date, id) keyset
+--   * lookup and dedupe by (symbol, title)
+--   * the latest summary of an article, and the unsummarized anti-join
+DO $$
+BEGIN
+    IF EXISTS (
+        SELECT 1 FROM investing.press_release
+        GROUP BY symbol, title HAVING count(*) > 1
+    ) THEN
+        RAISE EXCEPTION 'investing.press_release has duplicate (symbol, title) rows; '
+            'remove them before applying this migration';
+    END IF;
+END $$;
+
+CREATE INDEX IF NOT EXISTS press_release_symbol_date_idx
+    ON investing.press_release (symbol, date DESC, id DESC);
+
+CREATE UNIQUE INDEX IF NOT EXISTS press_release_symbol_title_key
+    ON investing.press_release (symbol, title);
+
+CREATE INDEX IF NOT EXISTS pr_summary_pr_id_timestamp_idx
+    ON investing.pr_summary (pr_id, timestamp DESC);
@@ -0,0 +1,18 @@
+-- Durable work queue for NewsAnalysisService. One row per article waiting
+-- for a summary; rows are deleted when the summary is saved.
+CREATE TABLE IF NOT EXISTS investing.summary_queue (
+    pr_id integer PRIMARY KEY
+        REFERENCES investing.press_release (id) ON DELETE CASCADE,
+    status text NOT NULL DEFAULT 'pending'
+        CHECK (status IN ('pending', 'leased', 'dead')),
+    attempts integer NOT NULL DEFAULT 0,
+    enqueued_at timestamptz NOT NULL DEFAULT now(),
+    available_at timestamptz NOT NULL DEFAULT now(),
+    leased_until timestamptz,
+    leased_by text,
+    last_error text
+);
+
+CREATE INDEX IF NOT EXISTS summary_queue_available_idx
+    ON investing.summary_queue (available_at)
+    WHERE status <> 'dead';
@@ -0,0 +1,8 @@
+-- Content-addressed summary reuse: summaries remember a hash of the
+-- normalized content, prompt template and model they were generated from.
+ALTER TABLE investing.pr_summary
+    ADD COLUMN IF NOT EXISTS content_hash text;
+
+CREATE INDEX IF NOT EXISTS pr_summary_content_hash_idx
+    ON investing.pr_summary (content_hash, timestamp DESC)
+    WHERE content_hash IS NOT NULL;
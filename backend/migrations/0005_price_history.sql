@@ -0,0 +1,12 @@
+-- Daily OHLCV bars cached from the upstream price source by
+-- StockDataService. Refreshes only append bars after the last stored date.
+CREATE TABLE IF NOT EXISTS investing.price_history (
+    symbol text NOT NULL,
+    date date NOT NULL,
+    open double precision,
+    high double precision,
+    low double precision,
+    close double precision,
+    volume bigint,
+    PRIMARY KEY (symbol, date)
+);
@@ -0,0 +1,14 @@
+-- Full-text search over article titles and content. The vector is a
+-- generated column, so Postgres keeps it current on every insert and
+-- update. Titles weigh more than body text in ranking. Content is capped
+-- because a tsvector must stay under 1MB, and converted filings can be
+-- very long.
+ALTER TABLE investing.press_release
+    ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', left(coalesce(content, ''), 500000)), 'B')
+    ) STORED;
+
+CREATE INDEX IF NOT EXISTS press_release_search_idx
+    ON investing.press_release USING gin (search_vector);
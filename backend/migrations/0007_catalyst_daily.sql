@@ -0,0 +1,71 @@
+-- Per symbol and day rollup of articles and their latest summaries, for
+-- catalyst overlays. Rows are recomputed by refresh_catalyst_days for the
+-- days touched whenever articles or summaries are saved, in the same
+-- transaction. Sentiment is free text from the model; anything summarized
+-- that is not "positive" or "negative" counts as neutral.
+CREATE TABLE IF NOT EXISTS investing.catalyst_daily (
+    symbol text NOT NULL,
+    date date NOT NULL,
+    article_count integer NOT NULL,
+    summarized_count integer NOT NULL,
+    positive_count integer NOT NULL,
+    negative_count integer NOT NULL,
+    neutral_count integer NOT NULL,
+    categories text[] NOT NULL DEFAULT '{}',
+    titles text[] NOT NULL DEFAULT '{}',
+    updated_at timestamptz NOT NULL DEFAULT now(),
+    PRIMARY KEY (symbol, date)
+);
+
+CREATE OR REPLACE FUNCTION investing.refresh_catalyst_days(symbols text[], dates date[])
+RETURNS void LANGUAGE plpgsql AS $$
+BEGIN
+    -- serialize refreshes per symbol, so the last writer to commit always
+    -- recomputes from everyone's rows (the first key namespaces the lock)
+    PERFORM pg_advisory_xact_lock(7023, hashtext(k.symbol))
+    FROM (SELECT DISTINCT symbol FROM unnest(symbols) AS u(symbol) ORDER BY symbol) k;
+
+    DELETE FROM investing.catalyst_daily cd
+    USING unnest(symbols, dates) AS k(symbol, date)
+    WHERE cd.symbol = k.symbol AND cd.date = k.date
+      AND NOT EXISTS (
+          SELECT 1 FROM investing.press_release pr
+          WHERE pr.symbol = k.symbol AND pr.date = k.date
+      );
+
+    INSERT INTO investing.catalyst_daily AS cd (
+        symbol, date, article_count, summarized_count, positive_count,
+        negative_count, neutral_count, categories, titles, updated_at
+    )
+    SELECT pr.symbol, pr.date,
+           count(*),
+           count(ps.sentiment_key),
+           count(*) FILTER (WHERE ps.sentiment_key = 'positive'),
+           count(*) FILTER (WHERE ps.sentiment_key = 'negative'),
+           count(*) FILTER (WHERE ps.sentiment_key NOT IN ('positive', 'negative')),
+           coalesce(array_agg(DISTINCT ps.category) FILTER (WHERE ps.category IS NOT NULL), '{}'),
+           array_agg(pr.title ORDER BY pr.id),
+           now()
+    FROM (SELECT DISTINCT symbol, date FROM unnest(symbols, dates) AS u(symbol, date)) k
+    JOIN investing.press_release pr ON pr.symbol = k.symbol AND pr.date = k.date
+    LEFT JOIN LATERAL (
+        SELECT category, coalesce(lower(trim(sentiment)), '') AS sentiment_key
+        FROM investing.pr_summary
+        WHERE pr_id = pr.id
+        ORDER BY timestamp DESC LIMIT 1
+    ) ps ON TRUE
+    GROUP BY pr.symbol, pr.date
+    ON CONFLICT (symbol, date) DO UPDATE SET
+        article_count = EXCLUDED.article_count,
+        summarized_count = EXCLUDED.summarized_count,
+        positive_count = EXCLUDED.positive_count,
+        negative_count = EXCLUDED.negative_count,
+        neutral_count = EXCLUDED.neutral_count,
+        categories = EXCLUDED.categories,
+        titles = EXCLUDED.titles,
+        updated_at = EXCLUDED.updated_at;
+END $$;
+
+-- backfill from what is already stored
+SELECT investing.refresh_catalyst_days(array_agg(symbol), array_agg(date))
+FROM (SELECT DISTINCT symbol, date FROM investing.press_release) k;
@@ -1,62 +1,66 @@
 import datetime
+import hashlib
 import logging
 import os
+from urllib.parse import urlparse
 
-from bs4 import BeautifulSoup
-import dateparser
-from lxml import etree
-import pymupdf4llm
-import requests
-
-from services import db
+from monitors.dates import DateParser
+from monitors.parsing import parse_html, parse_html_soup
+from monitors.search_config import SearchXPaths
+from services import db, http_client, DocumentConversionService
+from services.http_cache import get_validator_cache
 
 DEFAULT_DOWNLOAD_DIR = os.path.join(os.getcwd(), "downloads")
 
+def article_key(title: str) -> str:
+    """Key identifying an article for duplicate detection: the title with
+    whitespace collapsed and case folded.
+
+    press_release is unique on (symbol, title), so the date can't be part of
+    the key: a recurring title on a new date would pass this check, be
+    downloaded and converted, and then be dropped on insert. Normalizing
+    only ever matches more titles than the constraint does.
+    """
+    return " ".join(title.split()).casefold()
+
 class MonitorBase:
 
     def __init__(self, symbol: str, search_params=None):
         self.symbol = symbol.upper()
         self.search_params = search_params or {}
+        # compiled once here and reused on every pass; raises ValueError for
+        # a bad config
+        self.xpaths = SearchXPaths(self.search_params)
+        self.date_parser = DateParser()
         self.logger = logging.getLogger('.'.join([self.__module__, self.__class__.__name__]))
+        self.validator_cache = get_validator_cache()
+        # set by _fetch_with_requests when the listing page had not changed
+        self.parse_skipped = False
+        self._pending_validators = None
 
-    def get_existing_titles(self):
-        return db.get_titles_for_symbol(self.symbol)
+    def get_existing_titles(self) -> set:
+        """Get the article_key of every stored article for this symbol."""
+        return {article_key(title) for title in db.get_titles_for_symbol(self.symbol)}
 
     def _find_articles_lxml(self, dom):
-        """Find articles using lxml/xpath from search_params."""
-        params = self.search_params
+        """Find articles using the monitor's compiled XPath expressions."""
+        xpaths = self.xpaths
 
         # Find container first if specified
-        if params.get("container_id"):
-            containers = dom.xpath(f"//*[@id='{params['container_id']}']")
-            if not containers:
-                return []
-            container = containers[0]
-        elif params.get("container_class"):
-            containers = dom.xpath(f"//*[contains(@class, '{params['container_class']}')]")
+        if xpaths.container is not None:
+            containers = xpaths.container(dom, value=xpaths.container_value)
             if not containers:
                 return []
-            container = containers[0]
-        else:
-            container = dom
-
-        # Find articles by tag or xpath
-        if params.get("article_tag"):
-            articles = container.xpath(f".//{params['article_tag']}")
-        elif params.get("article_xpath"):
-            xpath = params["article_xpath"]
-            # If we have a container, make xpath relative
-            if container is not dom and xpath.startswith("//"):
-                xpath = "." + xpath
-            articles = container.xpath(xpath)
-        else:
-            articles = []
+            return xpaths.articles_in_container(containers[0])
+        return xpaths.articles(dom)
 
-        return articles
+    def _element_text(self, element):
+        text = element.text or self.xpaths.string(element) or ""
+        return text.strip()
 
-    def _extract_text(self, element, xpath):
-        """Extract text from element using xpath, handling various cases."""
-        results = element.xpath(xpath)
+    def _extract_text(self, element, xpath, **variables):
+        """Extract text from element using a compiled xpath, handling various cases."""
+        results = xpath(element, **variables)
         if not results:
             return None
 
@@ -66,67 +70,88 @@ class MonitorBase:
             return result.strip()
 
         # Otherwise it's an element, get its text content
-        text = result.text or result.xpath("string(.)") or ""
-        if isinstance(text, list):
-            text = text[0] if text else ""
-        return text.strip()
+        return self._element_text(result)
 
     def _extract_date(self, article):
         """Extract date from article element, handling date_join if needed."""
-        params = self.search_params
-        date_xpath = params.get("date_xpath")
-
-        if params.get("date_join"):
+        if self.search_params.get("date_join"):
             # Multiple elements need to be joined
-            date_elements = article.xpath(date_xpath)
             date_parts = []
-            for el in date_elements:
-                text = el.text or el.xpath("string(.)") or ""
-                if isinstance(text, list):
-                    text = text[0] if text else ""
-                if text.strip():
-                    date_parts.append(text.strip())
+            for el in self.xpaths.date(article):
+                text = el.strip() if isinstance(el, str) else self._element_text(el)
+                if text:
+                    date_parts.append(text)
             return " ".join(date_parts)
         else:
-            return self._extract_text(article, date_xpath)
+            return self._extract_text(article, self.xpaths.date)
+
+    def _absolute_url(self, url, base_url):
+        # Handle relative URLs
+        if url.startswith("/"):
+            parsed = urlparse(base_url)
+            url = f"{parsed.scheme}://{parsed.netloc}{url}"
+        return url
 
     def _extract_url(self, article, base_url):
         """Extract document URL from article, handling pdf_link_text if no url_xpath."""
-        params = self.search_params
+        xpaths = self.xpaths
 
-        if params.get("url_xpath"):
-            url = self._extract_text(article, params["url_xpath"])
+        if xpaths.url is not None:
+            url = self._extract_text(article, xpaths.url)
             if url:
-                # Handle relative URLs
-                if url.startswith("/"):
-                    from urllib.parse import urlparse
-                    parsed = urlparse(base_url)
-                    url = f"{parsed.scheme}://{parsed.netloc}{url}"
-                return url
+                return self._absolute_url(url, base_url)
 
         # Try pdf_link_text to find link directly on listing page
-        if params.get("pdf_link_text") and not params.get("requires_article_visit"):
-            link_text = params["pdf_link_text"]
-            links = article.xpath(f".//a[contains(text(), '{link_text}')]/@href")
-            if links:
-                url = links[0]
-                if url.startswith("/"):
-                    from urllib.parse import urlparse
-                    parsed = urlparse(base_url)
-                    url = f"{parsed.scheme}://{parsed.netloc}{url}"
-                return url
+        if xpaths.pdf_link is not None:
+            url = self._extract_text(article, xpaths.pdf_link,
+                                     link_text=xpaths.pdf_link_text)
+            if url:
+                return self._absolute_url(url, base_url)
 
         return None
 
+    def parse_page(self, content: bytes, content_type: str=None):
+        """Parse a listing page. Uses lxml directly unless the monitor config
+        sets ``parser: soup``, or lxml cannot make sense of the page."""
+        if self.search_params.get("parser") == "soup":
+            return parse_html_soup(content)
+        try:
+            dom = parse_html(content, content_type)
+        except Exception as e:
+            self.logger.warning(f"lxml failed to parse page, retrying with BeautifulSoup: {e}")
+            dom = None
+        if dom is None:
+            dom = parse_html_soup(content)
+        return dom
+
     def _fetch_with_requests(self):
         """Fetch articles using requests/lxml (no JavaScript required)."""
         params = self.search_params
         url = params.get("url")
-        existing_titles = self.get_existing_titles()
+        self.parse_skipped = False
+        self._pending_validators = None
+
+        resp = http_client.get(url, headers=self.validator_cache.conditional_headers(url))
+        if resp.status_code == 304:
+            self.logger.debug(f"{url} not modified, skipping parse")
+            self.parse_skipped = True
+            return []
+        # retries give up with the last response rather than raising, so an
+        # error page would otherwise be parsed as an empty listing
+        resp.raise_for_status()
+        content_hash = hashlib.sha256(resp.content).hexdigest()
+        if content_hash == self.validator_cache.get(url).get("content_hash"):
+            self.logger.debug(f"{url} content unchanged, skipping parse")
+            self.parse_skipped = True
+            return []
+        self._pending_validators = {
+            "etag": resp.headers.get("ETag"),
+            "last_modified": resp.headers.get("Last-Modified"),
+            "content_hash": content_hash,
+        }
 
-        resp = requests.get(url)
-        soup = BeautifulSoup(resp.content, "html.parser")
-        dom = etree.HTML(str(soup))
+        existing_titles = self.get_existing_titles()
+        dom = self.parse_page(resp.content, resp.headers.get("Content-Type"))
 
         articles = self._find_articles_lxml(dom)
         self.logger.debug(f"Found {len(articles)} articles on page")
@@ -135,14 +160,18 @@ class MonitorBase:
         for article in articles:
             try:
                 date = self._extract_date(article)
-                title = self._extract_text(article, params.get("title_xpath"))
+                title = self._extract_text(article, self.xpaths.title)
                 doc_url = self._extract_url(article, url)
 
                 if not title or not date:
                     continue
 
-                if (title, self.parse_date(date)) in existing_titles:
+                date = self.parse_date(date)
+                key = article_key(title)
+                if key in existing_titles:
                     continue
+                # also catches articles listed twice on the same page
+                existing_titles.add(key)
 
                 article_data.append({
                     "date": date,
@@ -154,33 +183,44 @@ class MonitorBase:
 
         return article_data
 
-    def fetch_news_articles(self, driver=None):
-        """Fetch news articles based on search_params configuration."""
-        params = self.search_params
+    def commit_page_validators(self):
+        """Remember the listing page's validators so an unchanged page is
+        skipped next time. Call once the page's articles have been saved."""
+        if self._pending_validators:
+            self.validator_cache.update(self.search_params.get("url"),
+                                        **self._pending_validators)
+            self._pending_validators = None
 
+    def fetch_news_articles(self, driver=None):
+        """Fetch news articles based on search_params configuration.
 
+        Documents are downloaded and handed off to DocumentConversionService;
+        each article with a document carries a pending "conversion" future
+        that DocumentConversionService.resolve turns into its content.
+        """
         article_data = self._fetch_with_requests()
 
-        # Download and convert PDFs to markdown
+        # Download PDFs and queue them for conversion to markdown
         for a in article_data:
             try:
                 if a.get("document_url"):
-                    a['content'] = pymupdf4llm.to_markdown(
-                        self.download_file(a['document_url'])
-                    )
-                    a['content-type'] = "text/markdown"
-                    a['retrieved_ts'] = datetime.datetime.now()
+                    path = self.download_file(a['document_url'])
+                    if path:
+                        a['document_path'] = path
+                        a['retrieved_ts'] = datetime.datetime.now()
+                        a['conversion'] = DocumentConversionService.submit(path)
             except Exception as e:
                 self.logger.warning(f"{type(e)} occurred while loading article {a['title'][:32]}:\n{e}")
 
         return article_data
 
     def parse_date(self, date_str: str) -> datetime.date:
-        return dateparser.parse(date_str).date()
+        return self.date_parser.parse(date_str)
 
-    def download_file(self, url, dest_dir=DEFAULT_DOWNLOAD_DIR, 
-                    session=None, timeout=30):
-        session = session or requests.Session()
+    def download_file(self, url, dest_dir=DEFAULT_DOWNLOAD_DIR,
+                    session=None, timeout=None):
+        session = session or http_client.get_session()
+        timeout = timeout or http_client.get_timeout()
         self.logger.info(f"Downloading file from {url}")
         try:
             response = session.get(url, stream=True, timeout=timeout)
@@ -0,0 +1,54 @@
+"""Fast parsing of the handful of date formats IR sites use."""
+import datetime
+
+import dateparser
+
+COMMON_FORMATS = (
+    "%B %d, %Y",
+    "%b %d, %Y",
+    "%b. %d, %Y",
+    "%A, %B %d, %Y",
+    "%m/%d/%Y",
+    "%m/%d/%y",
+    "%Y-%m-%d",
+    "%d %B %Y",
+    "%d %b %Y",
+    "%B %d %Y",
+    "%b %d %Y",
+)
+
+
+class DateParser:
+    """Parse date strings, trying known formats before falling back to dateparser.
+
+    Each site sticks to one or two formats, so whichever format last matched
+    is moved to the front and usually succeeds on the first strptime call.
+    Strings no format matches are handed to dateparser, which is far slower
+    but understands almost anything.
+
+    Args:
+        formats (iterable, optional): strptime formats to try
+    """
+
+    def __init__(self, formats=COMMON_FORMATS):
+        self._formats = list(formats)
+
+    def parse(self, date_str: str) -> datetime.date:
+        """Parse date_str into a date.
+
+        Raises:
+            ValueError: if the string cannot be parsed at all
+        """
+        text = " ".join(date_str.split())
+        for i, fmt in enumerate(self._formats):
+            try:
+                parsed = datetime.datetime.strptime(text, fmt).date()
+            except ValueError:
+                continue
+            if i:
+                self._formats.insert(0, self._formats.pop(i))
+            return parsed
+        parsed = dateparser.parse(text)
+        if parsed is None:
+            raise ValueError(f"Unrecognized date: {date_str!r}")
+        return parsed.date()
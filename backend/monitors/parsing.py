@@ -0,0 +1,78 @@
+"""Parse listing pages into lxml element trees."""
+import codecs
+import re
+import threading
+
+from bs4 import BeautifulSoup
+from lxml import etree
+
+_CONTENT_TYPE_CHARSET = re.compile(r'charset=["\']?([\w.:-]+)', re.I)
+_META_CHARSET = re.compile(rb'<meta[^>]+charset=["\']?([\w.:-]+)', re.I)
+_BOMS = (
+    (codecs.BOM_UTF8, "utf-8"),
+    (codecs.BOM_UTF16_LE, "utf-16-le"),
+    (codecs.BOM_UTF16_BE, "utf-16-be"),
+)
+
+# lxml parsers must not be shared between threads
+_local = threading.local()
+
+def _known_encoding(name) -> str:
+    if isinstance(name, bytes):
+        name = name.decode("ascii", "ignore")
+    try:
+        return codecs.lookup(name).name
+    except LookupError:
+        return None
+
+def detect_encoding(content: bytes, content_type: str=None) -> str:
+    """Work out the character encoding of an HTML document.
+
+    Checks, in order, the Content-Type header, a byte order mark and a
+    <meta charset> declaration near the top of the document. Falls back to
+    UTF-8 if the document decodes as UTF-8, otherwise Windows-1252.
+    """
+    if content_type:
+        match = _CONTENT_TYPE_CHARSET.search(content_type)
+        if match and _known_encoding(match.group(1)):
+            return _known_encoding(match.group(1))
+    for bom, encoding in _BOMS:
+        if content.startswith(bom):
+            return encoding
+    match = _META_CHARSET.search(content, 0, 4096)
+    if match and _known_encoding(match.group(1)):
+        return _known_encoding(match.group(1))
+    try:
+        content.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "cp1252"
+
+def _get_parser(encoding: str) -> etree.HTMLParser:
+    parsers = getattr(_local, "parsers", None)
+    if parsers is None:
+        parsers = _local.parsers = {}
+    parser = parsers.get(encoding)
+    if parser is None:
+        parser = parsers[encoding] = etree.HTMLParser(encoding=encoding)
+    return parser
+
+def parse_html(content: bytes, content_type: str=None):
+    """Parse response bytes directly into an lxml tree.
+
+    Args:
+        content (bytes): the raw response body
+        content_type (str, optional): the Content-Type response header
+
+    Returns:
+        lxml.etree._Element: the document root, or None if nothing parsed
+    """
+    if not content:
+        return None
+    return etree.fromstring(content, _get_parser(detect_encoding(content, content_type)))
+
+def parse_html_soup(content: bytes):
+    """Parse a page with BeautifulSoup and re-parse the cleaned markup with
+    lxml. Slower, but tolerates pages too malformed for libxml2."""
+    soup = BeautifulSoup(content, "html.parser")
+    return etree.HTML(str(soup))
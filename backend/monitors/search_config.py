@@ -0,0 +1,78 @@
+"""Compile monitoring.yaml press_releases blocks into reusable XPath objects."""
+from lxml import etree
+
+REQUIRED_KEYS = ("url", "title_xpath", "date_xpath")
+
+
+class SearchXPaths:
+    """Compiled XPath expressions for one press_releases config block.
+
+    Values from the config that are matched against page content (container
+    ids and classes, pdf_link_text) are passed to the expressions as XPath
+    variables rather than interpolated, so quotes in them are harmless.
+
+    Args:
+        params (dict): the press_releases block
+
+    Raises:
+        ValueError: if required keys are missing or an expression is invalid
+    """
+
+    def __init__(self, params: dict):
+        missing = [k for k in REQUIRED_KEYS if not params.get(k)]
+        if missing:
+            raise ValueError(f"missing {', '.join(missing)}")
+        if not (params.get("article_tag") or params.get("article_xpath")):
+            raise ValueError("one of article_tag or article_xpath is required")
+        try:
+            self._compile(params)
+        except etree.XPathSyntaxError as e:
+            raise ValueError(f"invalid XPath: {e}") from e
+
+    def _compile(self, params: dict):
+        self.container = None
+        self.container_value = None
+        if params.get("container_id"):
+            self.container = etree.XPath("//*[@id=$value]")
+            self.container_value = params["container_id"]
+        elif params.get("container_class"):
+            self.container = etree.XPath("//*[contains(@class, $value)]")
+            self.container_value = params["container_class"]
+
+        if params.get("article_tag"):
+            self.articles = etree.XPath(".//" + params["article_tag"])
+            self.articles_in_container = self.articles
+        else:
+            xpath = params["article_xpath"]
+            self.articles = etree.XPath(xpath)
+            # inside a container, absolute expressions are made relative
+            if xpath.startswith("//"):
+                xpath = "." + xpath
+            self.articles_in_container = etree.XPath(xpath)
+
+        self.title = etree.XPath(params["title_xpath"])
+        self.date = etree.XPath(params["date_xpath"])
+        self.url = etree.XPath(params["url_xpath"]) if params.get("url_xpath") else None
+        self.pdf_link = None
+        self.pdf_link_text = params.get("pdf_link_text")
+        if self.pdf_link_text and not params.get("requires_article_visit"):
+            self.pdf_link = etree.XPath(".//a[contains(text(), $link_text)]/@href")
+        self.string = etree.XPath("string(.)")
+
+def validate_config(config: dict):
+    """Compile every press_releases block in the monitoring config.
+
+    Raises:
+        ValueError: naming each company whose block is invalid
+    """
+    errors = []
+    for symbol, company in (config.get("company") or {}).items():
+        params = (company or {}).get("press_releases")
+        if not params:
+            continue
+        try:
+            SearchXPaths(params)
+        except ValueError as e:
+            errors.append(f"{symbol}: {e}")
+    if errors:
+        raise ValueError("Invalid monitoring config:\n" + "\n".join(errors))
@@ -0,0 +1,185 @@
+"""Server-side rendering of price charts with news overlays.
+
+Draws the same chart as ui.PriceNewsPlot (candles, volume along the
+bottom, and catalyst days shaded by sentiment) without pyplot or a
+display. It uses matplotlib's Agg backend, with one collection per layer
+instead of a bar call per series.
+
+Rendered images are cached under a key made of the symbol, a digest of
+its bars, the newest article and summary IDs, and the format. New or
+re-adjusted bars or news produce a new key, so cached images never need
+invalidating; stale ones age out of the LRU.
+"""
+import contextlib
+import hashlib
+import io
+import logging
+import os
+import threading
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.collections import LineCollection, PolyCollection
+import matplotlib.dates as mdates
+from matplotlib.figure import Figure
+import numpy as np
+import pandas as pd
+
+from services import db, StockDataService
+from services.response_cache import CachedResponse, ResponseCache
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"png": "image/png", "svg": "image/svg+xml"}
+UP_COLOR = (0.0, 0.5, 0.0, 1.0)
+DOWN_COLOR = (1.0, 0.0, 0.0, 1.0)
+VOLUME_COLOR = (0.0, 0.0, 1.0, 1.0)
+CATALYST_COLORS = {
+    "positive": (0.0, 0.5, 0.0, 0.44),
+    "negative": (1.0, 0.0, 0.0, 0.44),
+    "neutral": (0.6, 0.6, 0.6, 0.44),
+}
+
+def _rectangles(left, right, bottom, top) -> np.ndarray:
+    """Vertices of one rectangle per element, shaped (n, 4, 2)."""
+    left, right, bottom, top = np.broadcast_arrays(left, right, bottom, top)
+    return np.stack([
+        np.column_stack([left, bottom]),
+        np.column_stack([left, top]),
+        np.column_stack([right, top]),
+        np.column_stack([right, bottom]),
+    ], axis=1)
+
+def render_chart(symbol: str, prices: pd.DataFrame, catalysts: pd.DataFrame=None,
+                 fmt: str="png", size: tuple=(12, 6), dpi: int=100) -> bytes:
+    """Render a candlestick chart with volume and catalyst days.
+
+    Args:
+        symbol (str): stock symbol, for the title
+        prices (DataFrame): daily bars indexed by date with Open, High,
+            Low, Close and Volume columns
+        catalysts (DataFrame, optional): news days indexed by date with
+            positive_count and negative_count columns
+        fmt (str, optional): "png" or "svg"
+        size (tuple, optional): figure size in inches
+        dpi (int, optional): resolution
+
+    Returns:
+        bytes: the encoded image
+    """
+    fig = Figure(figsize=size, dpi=dpi)
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    x = mdates.date2num(prices.index.to_pydatetime())
+    o, h, l, c = (prices[col].to_numpy(dtype=np.float64)
+                  for col in ("Open", "High", "Low", "Close"))
+    volume = prices["Volume"].fillna(0).to_numpy(dtype=np.float64)
+    colors = np.where((c >= o)[:, None], UP_COLOR, DOWN_COLOR)
+    bottom, top = np.nanmin(l), np.nanmax(h)
+
+    if catalysts is not None and len(catalysts):
+        days = catalysts[catalysts.index.isin(prices.index)]
+        cx = mdates.date2num(days.index.to_pydatetime())
+        shade = np.select(
+            [days["positive_count"].to_numpy() > 0, days["negative_count"].to_numpy() > 0],
+            ["positive", "negative"], "neutral")
+        ax.add_collection(PolyCollection(
+            _rectangles(cx - 0.475, cx + 0.475, bottom, top),
+            facecolors=[CATALYST_COLORS[s] for s in shade], edgecolors="none", zorder=1))
+
+    # volume takes up the bottom 10% of the chart, as in PriceNewsPlot
+    max_volume = volume.max() or 1
+    volume_top = bottom + (top - bottom) / 10 * volume / max_volume
+    ax.add_collection(PolyCollection(
+        _rectangles(x - 0.45, x + 0.45, bottom, volume_top),
+        facecolors=VOLUME_COLOR, edgecolors="none", zorder=2))
+
+    wicks = np.stack([np.column_stack([x, l]), np.column_stack([x, h])], axis=1)
+    ax.add_collection(LineCollection(wicks, colors=colors, linewidths=1, zorder=3))
+    ax.add_collection(PolyCollection(
+        _rectangles(x - 0.45, x + 0.45, np.minimum(o, c), np.maximum(o, c)),
+        facecolors=colors, edgecolors=colors, linewidths=0.5, zorder=4))
+
+    ax.xaxis_date()
+    ax.autoscale_view()
+    ax.set_title(f"{symbol} Candlestick Chart")
+    for label in ax.get_xticklabels():
+        label.set_rotation(30)
+        label.set_horizontalalignment("right")
+    fig.tight_layout()
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format=fmt)
+    return buffer.getvalue()
+
+_cache = None
+_cache_lock = threading.Lock()
+# key -> [lock, holders]; concurrent requests for the same chart wait for
+# one render instead of each rendering it, while other charts render freely
+_render_locks = {}
+
+def get_chart_cache() -> ResponseCache:
+    """Return the rendered chart cache, sized by CHART_CACHE_MAX_BYTES
+    (default 32MB)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                max_bytes = int(os.getenv("CHART_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+                _cache = ResponseCache(max_bytes, max_bytes)
+    return _cache
+
+@contextlib.contextmanager
+def _render_lock(key: tuple):
+    with _cache_lock:
+        entry = _render_locks.setdefault(key, [threading.Lock(), 0])
+        entry[1] += 1
+    try:
+        with entry[0]:
+            yield
+    finally:
+        with _cache_lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _render_locks[key]
+
+def chart_key(symbol: str, fmt: str) -> tuple:
+    """Key identifying the chart's current content, without rendering it.
+
+    Returns:
+        tuple: (key, prices) where prices is the frame to render from
+    """
+    prices = StockDataService.get_price_frames([symbol])[symbol].dropna(subset=["Close"])
+    # a digest rather than the last bar's date: a split replaces the history
+    bars = hashlib.sha1(prices.index.values.tobytes())
+    bars.update(prices[["Open", "High", "Low", "Close", "Volume"]].to_numpy().tobytes())
+    article_id, summary_id = db.get_latest_article_ids(symbol)
+    return ("charts", symbol, bars.hexdigest(), article_id, summary_id, fmt), prices
+
+def get_chart(symbol: str, fmt: str="png") -> tuple:
+    """Get the current chart for symbol, rendering it only if its prices or
+    news changed since it was last rendered.
+
+    Returns:
+        tuple: (image bytes, key, whether it came from the cache). the
+        image is None if there are no bars to draw
+    """
+    key, prices = chart_key(symbol, fmt)
+    if not len(prices):
+        return None, key, False
+    cache = get_chart_cache()
+    entry = cache.get(key)
+    if entry is not None:
+        return entry.body, key, True
+    catalysts = pd.DataFrame(
+        db.get_catalysts(symbol, start=prices.index[0].date()),
+        columns=["date", "positive_count", "negative_count"])
+    catalysts = catalysts.set_index(pd.DatetimeIndex(pd.to_datetime(catalysts.pop("date"))))
+    with _render_lock(key):
+        entry = cache.peek(key)
+        if entry is not None:
+            return entry.body, key, True
+        image = render_chart(symbol, prices, catalysts, fmt)
+        cache.put(key, cache.generation("charts", symbol), CachedResponse(image, FORMATS[fmt]))
+    logger.info(f"Rendered {fmt} chart for {symbol} ({len(image)} bytes)")
+    return image, key, False
@@ -0,0 +1,161 @@
+"""Convert downloaded documents to markdown in worker processes.
+
+Conversion with pymupdf4llm is CPU-bound and holds the GIL, so it runs in
+separate processes. Each document gets its own process, so one that hangs
+can be killed without holding up the others. Monitors submit file paths
+and get back futures; the results are collected with resolve() once the
+monitor has finished fetching.
+"""
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import multiprocessing
+import os
+import threading
+
+import pymupdf
+import pymupdf4llm
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+def get_executor() -> ThreadPoolExecutor:
+    """Return the shared pool that runs conversions, starting it on first use.
+
+    Each thread of the pool runs one conversion at a time in a child
+    process. The number of threads, and so of concurrent conversions, is set
+    by CONVERSION_WORKERS (default: half the available CPUs).
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = int(os.getenv("CONVERSION_WORKERS",
+                                        max(1, (os.cpu_count() or 2) // 2)))
+                logger.info(f"Starting {workers} document conversion workers")
+                _executor = ThreadPoolExecutor(
+                    max_workers=workers, thread_name_prefix="conversion")
+    return _executor
+
+def _context():
+    # not fork: the parent process is full of threads. a fork server with
+    # this module preloaded starts each child without re-importing pymupdf
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload([__name__])
+        return context
+    return multiprocessing.get_context("spawn")
+
+def _child(sender, target, args):
+    try:
+        sender.send((True, target(*args)))
+    except Exception as e:
+        sender.send((False, f"{type(e).__name__}: {e}"))
+
+def _run(target, args: tuple, timeout: float):
+    """Call target(*args) in a new process, killing it if it takes longer
+    than timeout seconds.
+
+    Raises:
+        TimeoutError: if the process was killed
+        RuntimeError: if target raised or the process died
+    """
+    context = _context()
+    receiver, sender = context.Pipe(duplex=False)
+    process = context.Process(target=_child, args=(sender, target, args), daemon=True)
+    process.start()
+    sender.close()
+    try:
+        if not receiver.poll(timeout):
+            raise TimeoutError(f"{target.__name__} did not finish in {timeout}s")
+        try:
+            ok, value = receiver.recv()
+        except EOFError:
+            process.join()
+            raise RuntimeError(f"conversion process exited with code {process.exitcode}")
+    finally:
+        if process.is_alive():
+            process.kill()
+        process.join()
+        receiver.close()
+    if not ok:
+        raise RuntimeError(value)
+    return value
+
+def extract_text(path: str, page_limit: int) -> tuple:
+    """Extract plain text from a PDF. Much cheaper than markdown conversion.
+
+    Returns:
+        tuple: (content, content_type)
+    """
+    with pymupdf.open(path) as doc:
+        pages = range(min(doc.page_count, page_limit))
+        content = "\n\n".join(doc[i].get_text() for i in pages)
+    return content, "text/plain"
+
+def convert_document(path: str, page_limit: int, text_only_pages: int) -> tuple:
+    """Convert a PDF to markdown. Runs in a worker process.
+
+    Args:
+        path (str): path to the downloaded PDF
+        page_limit (int): only the first page_limit pages are converted
+        text_only_pages (int): documents with more pages than this fall back
+            to plain text extraction
+
+    Returns:
+        tuple: (content, content_type)
+    """
+    with pymupdf.open(path) as doc:
+        page_count = doc.page_count
+    if page_count > text_only_pages:
+        return extract_text(path, page_limit)
+    pages = list(range(min(page_count, page_limit)))
+    return pymupdf4llm.to_markdown(path, pages=pages), "text/markdown"
+
+def _convert(path: str, page_limit: int, text_only_pages: int, timeout: float) -> tuple:
+    try:
+        return _run(convert_document, (path, page_limit, text_only_pages), timeout)
+    except TimeoutError:
+        logger.warning(f"Converting {path} timed out after {timeout}s, "
+                       "falling back to text extraction")
+    return _run(extract_text, (path, page_limit), timeout)
+
+def submit(path: str):
+    """Queue a document for conversion.
+
+    Page limits are set by CONVERSION_PAGE_LIMIT (default 50) and
+    CONVERSION_TEXT_ONLY_PAGES (default 100). A conversion taking longer
+    than CONVERSION_TIMEOUT seconds (default 120) is killed and plain text
+    extraction, with the same timeout, is tried instead. The clock starts
+    when the conversion does, so time spent queued behind other documents
+    does not count against it.
+
+    Returns:
+        concurrent.futures.Future: resolves to a (content, content_type) tuple
+    """
+    return get_executor().submit(
+        _convert, path,
+        int(os.getenv("CONVERSION_PAGE_LIMIT", "50")),
+        int(os.getenv("CONVERSION_TEXT_ONLY_PAGES", "100")),
+        float(os.getenv("CONVERSION_TIMEOUT", "120")),
+    )
+
+def resolve(article: dict):
+    """Wait for an article's pending conversion and store the result on it.
+
+    Args:
+        article (dict): article data as returned by
+            MonitorBase.fetch_news_articles
+    """
+    future = article.pop("conversion", None)
+    if future is None:
+        return
+    try:
+        content, content_type = future.result()
+    except Exception as e:
+        logger.warning(f"{type(e).__name__} occurred while converting "
+                       f"article {article['title'][:32]}:\n{e}")
+        return
+    article['content'] = content
+    article['content-type'] = content_type
@@ -1,21 +1,32 @@
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from contextlib import contextmanager
 import datetime
 import logging
 import os
+import threading
 import time
+from urllib.parse import urlparse
 
 import yaml
 
 from monitors import MonitorBase
-from services import db, NewsAnalysisService
+from monitors.search_config import validate_config
+from services import db, DocumentConversionService
 
 logger = logging.getLogger(__name__)
 
 CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "monitoring.yaml")
 
 def load_config():
-    """Load monitoring configuration from YAML file."""
+    """Load monitoring configuration from YAML file.
+
+    Raises:
+        ValueError: if any press_releases block is invalid
+    """
     with open(CONFIG_PATH, "r") as f:
-        return yaml.safe_load(f)
+        config = yaml.safe_load(f)
+    validate_config(config)
+    return config
 
 def get_monitor_config(config, symbol):
     """Get the press_releases config for a given symbol."""
@@ -25,18 +36,130 @@ def get_monitor_config(config, symbol):
         return None
     return company_config.get("press_releases")
 
+_monitors = {}
+_busy_monitors = set()
+_monitors_lock = threading.Lock()
+
+@contextmanager
+def checkout_monitor(symbol, search_params):
+    """Check out the monitor for symbol, reusing the one from earlier passes
+    (and its compiled XPath expressions) unless its config has changed.
+
+    A monitor keeps per-pass state, so one still running, e.g. abandoned
+    by an earlier pass that timed out, is never handed out twice; a
+    throwaway monitor is used instead until it finishes.
+    """
+    with _monitors_lock:
+        monitor = _monitors.get(symbol)
+        if monitor is None or monitor.search_params != search_params:
+            monitor = MonitorBase(symbol, search_params)
+            _monitors[symbol] = monitor
+        if monitor in _busy_monitors:
+            monitor = MonitorBase(symbol, search_params)
+        else:
+            _busy_monitors.add(monitor)
+    try:
+        yield monitor
+    finally:
+        with _monitors_lock:
+            _busy_monitors.discard(monitor)
+
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
+
+def get_host_semaphore(url: str) -> threading.BoundedSemaphore:
+    """Get the semaphore limiting concurrent monitors against url's host.
+
+    The limit per host is set by MONITOR_HOST_CONCURRENCY (default 2).
+    """
+    host = urlparse(url or "").netloc
+    with _host_semaphores_lock:
+        semaphore = _host_semaphores.get(host)
+        if semaphore is None:
+            semaphore = threading.BoundedSemaphore(
+                int(os.getenv("MONITOR_HOST_CONCURRENCY", "2")))
+            _host_semaphores[host] = semaphore
+        return semaphore
+
+def run_monitor(symbol, search_params, started, abandoned):
+    """Fetch and save new articles for one symbol.
+
+    Args:
+        symbol (str): the stock symbol
+        search_params (dict): the press_releases config for the symbol
+        started (dict): shared map of symbol -> monotonic start time, filled
+            in once the monitor gets past its host's concurrency limit
+        abandoned (threading.Event): set by run_once if the monitor times
+            out; new articles are then not saved or queued
+
+    Returns:
+        dict: articles_found and articles_not_saved counts, and whether the
+        listing page was unchanged and not parsed
+    """
+    with checkout_monitor(symbol, search_params) as monitor:
+        with get_host_semaphore(search_params.get("url")):
+            started[symbol] = time.monotonic()
+            new_articles = monitor.fetch_news_articles()
+        # conversion runs in worker processes; wait outside the host's slot
+        for a in new_articles:
+            DocumentConversionService.resolve(a)
+        logger.info(f"Found {len(new_articles)} new articles for {symbol}")
+        if abandoned.is_set():
+            logger.warning(f"Monitor for {symbol} finished after timing out; "
+                           f"{len(new_articles)} articles discarded")
+            return {"articles_found": 0, "articles_not_saved": 0, "parse_skipped": False}
+        articles_not_saved = 0
+        try:
+            results = db.save_new_articles([
+                (symbol, a['date'], a['title'], a.get('content-type'),
+                 a.get('content'), a.get('document_url'), a.get('retrieved_ts'))
+                for a in new_articles
+            ], queue_summaries=True)
+        except Exception as e:
+            results = [e] * len(new_articles)
+        for a, result in zip(new_articles, results):
+            if isinstance(result, Exception):
+                logger.error(f"{type(result).__name__} occurred while saving "
+                            f"article {a['title']}. Article not saved")
+                articles_not_saved += 1
+            elif result is None:
+                logger.info(f"Article {a['title']} is already stored for {symbol}")
+        if not articles_not_saved:
+            # only skip this page next time once everything on it is stored
+            monitor.commit_page_validators()
+        return {
+            "articles_found": len(new_articles),
+            "articles_not_saved": articles_not_saved,
+            "parse_skipped": monitor.parse_skipped,
+        }
+
 def run_once(config=None):
-    """Run a single monitoring pass for all symbols in the watchlist."""
+    """Run a single monitoring pass for all symbols in the watchlist.
+
+    Monitors run on a pool of MONITOR_WORKERS threads (default 4), with at
+    most MONITOR_HOST_CONCURRENCY running against any one host. A monitor
+    still running MONITOR_TIMEOUT seconds (default 300) after it started is
+    reported as timed out and its results are discarded.
+    """
     config = config or load_config()
     start_time = int(round(time.time(), 0))
     monitors_executed = 0
     articles_found = 0
     missing_configs = []
     articles_not_saved = 0
+    parses_skipped = 0
     other_errors = []
+    symbol_timings = {}
     watchlist = db.get_watch_list()
     logger.debug(f"Found {len(watchlist)} watches: {watchlist}")
+    timeout = float(os.getenv("MONITOR_TIMEOUT", "300"))
+    started = {}
+    executor = ThreadPoolExecutor(
+        max_workers=int(os.getenv("MONITOR_WORKERS", "4")),
+        thread_name_prefix="monitor",
+    )
     try:
+        futures = {}
         for symbol in watchlist:
             search_params = get_monitor_config(config, symbol)
             if not search_params:
@@ -44,38 +167,53 @@ def run_once(config=None):
                 missing_configs.append(symbol)
                 continue
             logger.debug(f"Monitor config for {symbol}: {search_params.get('url')}")
-            monitor = MonitorBase(symbol, search_params)
-            try:
-                new_articles = monitor.fetch_news_articles()
-                logger.info(f"Found {len(new_articles)} new articles for {symbol}")
-                articles_found += len(new_articles)
-                for a in new_articles:
-                    try:
-                        a['pr_id'] = db.save_new_article(
-                            symbol, a['date'], a['title'], a.get('content-type'),
-                            a.get('content'), a.get('document_url'), a.get('retrieved_ts')
-                        )
-                    except Exception as e:
-                        logger.error(f"{type(e).__name__} occurred while saving "
-                                    f"article {a['title']}. Article not saved")
-                        articles_not_saved += 1
-                for a in new_articles:
-                    if "pr_id" in a:
-                        NewsAnalysisService.queue_article(a)
-                monitors_executed += 1
-            except Exception as e:
-                logger.error(f"Unexpected {type(e).__name__} occurred while "
-                             f"monitoring {symbol} news: {e}")
-                other_errors.append((symbol, type(e).__name__))
+            abandoned = threading.Event()
+            future = executor.submit(run_monitor, symbol, search_params, started, abandoned)
+            futures[future] = (symbol, abandoned)
+
+        pending = set(futures)
+        last_progress = time.monotonic()
+        while pending:
+            done, pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+            now = time.monotonic()
+            if done:
+                last_progress = now
+            for future in done:
+                symbol, _ = futures[future]
+                symbol_timings[symbol] = round(now - started.get(symbol, now), 3)
+                try:
+                    result = future.result()
+                    articles_found += result["articles_found"]
+                    articles_not_saved += result["articles_not_saved"]
+                    parses_skipped += result["parse_skipped"]
+                    monitors_executed += 1
+                except Exception as e:
+                    logger.error(f"Unexpected {type(e).__name__} occurred while "
+                                 f"monitoring {symbol} news: {e}")
+                    other_errors.append((symbol, type(e).__name__))
+            for future in list(pending):
+                symbol, abandoned = futures[future]
+                if symbol in started:
+                    timed_out = now - started[symbol] > timeout
+                else:
+                    # queued behind a host slot held by a hung monitor
+                    timed_out = now - last_progress > timeout
+                if timed_out:
+                    logger.error(f"Monitor for {symbol} timed out after {timeout}s")
+                    abandoned.set()
+                    pending.discard(future)
+                    symbol_timings[symbol] = round(now - started.get(symbol, now), 3)
+                    other_errors.append((symbol, "TimeoutError"))
     finally:
-        ...
+        # don't wait on monitors that timed out; they are flagged as abandoned
+        executor.shutdown(wait=False, cancel_futures=True)
     end_time = int(round(time.time(), 0))
     elapsed = end_time - start_time
     message = (
         f"MonitoringService finished in {elapsed}s\n"
-        " Monitors | Articles | Failures |  Errors  \n"
+        " Monitors | Articles | Failures |  Errors  | Unchanged \n"
         f"{monitors_executed:^10d}|{articles_found:^10d}|"
-        f"{articles_not_saved:^10d}|{len(other_errors):^10d}"
+        f"{articles_not_saved:^10d}|{len(other_errors):^10d}|{parses_skipped:^11d}"
     )
     if missing_configs:
         message += "\nConfigs not found:\n"
@@ -89,6 +227,8 @@ def run_once(config=None):
         logger.warning(message)
     else:
         logger.info(message)
+    logger.debug(f"Per-symbol timings: {symbol_timings}")
+    logger.debug(f"Database pool stats: {db.get_pool().stats()}")
     return {
         "start_time": start_time,
         "end_time": end_time,
@@ -96,8 +236,10 @@ def run_once(config=None):
         "monitors_executed": monitors_executed,
         "articles_found": articles_found,
         "articles_not_saved": articles_not_saved,
+        "parses_skipped": parses_skipped,
         "missing_configs": missing_configs,
         "other_errors": other_errors,
+        "symbol_timings": symbol_timings,
     }
 
 
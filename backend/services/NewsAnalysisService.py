@@ -1,51 +1,335 @@
-from datetime import datetime
+"""Summarize press releases with the inference server.
+
+Articles waiting for a summary live in the investing.summary_queue table,
+so the backlog survives restarts and can be shared by several summarizer
+processes. Queue items carry only the article ID; content is loaded when a
+worker picks the job up.
+"""
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+import hashlib
 import json
 import logging
 import os
-from queue import Queue
+from queue import Empty, Queue
+import random
+import socket
+import threading
+import time
 
 import requests
 
-from services import db
+from services import chunking, db
 
 logger = logging.getLogger(__name__)
 
-_article_queue = Queue()
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+# finished summaries waiting to be written by _write_summaries
+_summary_queue = Queue()
+
+_stats_lock = threading.Lock()
+_stats = {
+    "summarized": 0,
+    "failed": 0,
+    "dead_lettered": 0,
+    "cache_hits": 0,
+    "cache_misses": 0,
+    "saved": 0,
+    "not_saved": 0,
+    "latency_total": 0.0,
+    "latency_max": 0.0,
+}
+
+def _record(**counts):
+    with _stats_lock:
+        for key, value in counts.items():
+            if key == "latency":
+                _stats["latency_total"] += value
+                _stats["latency_max"] = max(_stats["latency_max"], value)
+            else:
+                _stats[key] += value
+
+def get_stats() -> dict:
+    """Return queue depths and summarization counters for this process.
+
+    latency_avg and latency_max are seconds from an article being queued to
+    its summary being received.
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    latency_total = stats.pop("latency_total")
+    stats["latency_avg"] = (latency_total / stats["summarized"]
+                            if stats["summarized"] else 0.0)
+    try:
+        stats["queue_depth"] = db.get_summary_queue_depth()
+    except Exception as e:
+        logger.warning(f"Could not read summary queue depth: {e}")
+        stats["queue_depth"] = None
+    stats["pending_writes"] = _summary_queue.qsize()
+    return stats
+
+class _LRUCache:
+    """Small thread-safe LRU map."""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+_summary_cache = None
+_summary_cache_lock = threading.Lock()
 
-def queue_article(article: dict):
-    _article_queue.put(article)
-    logger.debug(f"Article {article['title']} queued for summarization")
+def _get_summary_cache() -> _LRUCache:
+    global _summary_cache
+    if _summary_cache is None:
+        with _summary_cache_lock:
+            if _summary_cache is None:
+                _summary_cache = _LRUCache(int(os.getenv("SUMMARY_CACHE_SIZE", "1024")))
+    return _summary_cache
+
+def content_hash(content: str):
+    """Hash article content together with the prompt template and model.
+
+    Whitespace is normalized first, so the same release reformatted by a
+    different listing page hashes the same. The model is taken from
+    INFERENCE_MODEL, since the inference server only reports it afterwards.
+
+    Returns:
+        str: hex digest, or None when INFERENCE_MODEL is unset, since a key
+            without the model would keep serving summaries after a model change
+    """
+    model = os.getenv("INFERENCE_MODEL")
+    if not model:
+        return None
+    normalized = " ".join(content.split())
+    key = "\0".join([normalized, PROMPT_TEMPLATE, model])
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+def get_cached_summary(digest: str):
+    """Look up an existing summary for identical content, first in the
+    in-process LRU (SUMMARY_CACHE_SIZE entries) and then in the database."""
+    summary_data = _get_summary_cache().get(digest)
+    if summary_data is None:
+        row = db.find_summary_by_hash(digest)
+        if row:
+            summary_data = {
+                "summary": row['summary'],
+                "category": row['category'],
+                "sentiment": row['sentiment'],
+                "model": row['model_used'],
+                "prompt": {
+                    "role": "user",
+                    "content": PROMPT_TEMPLATE,
+                }
+            }
+            _get_summary_cache().put(digest, summary_data)
+    _record(**{"cache_hits" if summary_data else "cache_misses": 1})
+    return summary_data
 
 def start():
-    logger.info("Starting Summarization Service")
+    """Start the summarization workers and the summary writer, and block.
+
+    SUMMARIZER_WORKERS (default 2) inference calls run at once, each taking
+    up to SUMMARIZER_BATCH_SIZE (default 1) articles. The limit covers the
+    chunk calls long articles fan out into as well.
+    """
+    workers = int(os.getenv("SUMMARIZER_WORKERS", "2"))
+    batch_size = int(os.getenv("SUMMARIZER_BATCH_SIZE", "1"))
+    logger.info(f"Starting Summarization Service with {workers} workers")
+    if not os.getenv("INFERENCE_MODEL"):
+        logger.warning("INFERENCE_MODEL is not set; summaries will not be cached "
+                       "by content hash")
 
+    threads = [threading.Thread(target=_write_summaries, name="summary-writer",
+                                daemon=True)]
+    threads += [
+        threading.Thread(target=_summarize_queued, args=(batch_size,),
+                         name=f"summarizer-{i}", daemon=True)
+        for i in range(workers)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def _fail(article_id, title, error: Exception):
+    try:
+        status = db.fail_summary_job(
+            article_id, f"{type(error).__name__}: {error}",
+            int(os.getenv("SUMMARY_MAX_ATTEMPTS", "5")),
+            float(os.getenv("SUMMARY_RETRY_DELAY", "60")),
+        )
+    except Exception as e:
+        # the lease will expire and the job will be retried anyway
+        logger.error(f"{type(e).__name__} occurred while releasing job for {title}: {e}")
+        return
+    if status == "dead":
+        logger.error(f"Giving up on article {title}; moved to dead letters")
+        _record(dead_lettered=1)
+
+def _summarize_queued(batch_size: int):
+    """Worker loop: lease up to batch_size queued articles and summarize them.
+
+    Leases last SUMMARY_LEASE_SECONDS (default 900). A job is given up on
+    after SUMMARY_MAX_ATTEMPTS leases (default 5), whether they failed or
+    expired. When the queue is empty the worker polls every
+    SUMMARIZER_POLL_INTERVAL seconds (default 5).
+    """
+    worker = f"{socket.gethostname()}:{os.getpid()}:{threading.current_thread().name}"
+    lease_seconds = float(os.getenv("SUMMARY_LEASE_SECONDS", "900"))
+    poll_interval = float(os.getenv("SUMMARIZER_POLL_INTERVAL", "5"))
+    max_attempts = int(os.getenv("SUMMARY_MAX_ATTEMPTS", "5"))
     while True:
-        article: dict = _article_queue.get(True)
-        logger.info(f"Processing article: {article['title']}")
         try:
-            summary_data = summarize_article(article)
-            logger.info(f"Article {article['title']} processed")
+            jobs, dead_lettered = db.lease_summary_jobs(
+                batch_size, lease_seconds, worker, max_attempts)
         except Exception as e:
+            logger.error(f"{type(e).__name__} occurred while leasing summary jobs: {e}")
+            jobs, dead_lettered = [], 0
+        if dead_lettered:
+            logger.error(f"Moved {dead_lettered} summary jobs whose leases kept "
+                         "expiring to dead letters")
+            _record(dead_lettered=dead_lettered)
+        if not jobs:
+            time.sleep(poll_interval)
+            continue
+
+        handled = set()
+        try:
+            _process_jobs(jobs, handled)
+        except Exception as e:
+            # e.g. the database went away; release what wasn't dealt with
+            # rather than letting the worker thread die
+            logger.error(f"{type(e).__name__} occurred while processing summary jobs: {e}")
+            failed = [pr_id for pr_id, _, _ in jobs if pr_id not in handled]
+            for pr_id in failed:
+                _fail(pr_id, f"article {pr_id}", e)
+            _record(failed=len(failed))
+
+def _process_jobs(jobs: list, handled: set):
+    """Summarize one leased batch, or reuse cached summaries for it.
+
+    Args:
+        jobs (list): (pr_id, attempts, enqueued_at) tuples from
+            db.lease_summary_jobs
+        handled (set): filled with the IDs of jobs that have been queued
+            for writing or released, so the caller knows which still need
+            releasing if this raises
+    """
+    batch = []
+    for pr_id, attempts, enqueued_at in jobs:
+        article = db.get_article(pr_id)
+        if article is None:
+            handled.add(pr_id)
+            continue
+        logger.info(f"Processing article: {article['title']} (attempt {attempts})")
+        batch.append((enqueued_at, article))
+    if not batch:
+        return
+
+    uncached = []
+    for enqueued_at, article in batch:
+        if article.get('content'):
+            article['content_hash'] = content_hash(article['content'])
+        if article.get('content_hash'):
+            summary_data = get_cached_summary(article['content_hash'])
+            if summary_data:
+                logger.info(f"Reusing cached summary for article {article['title']}")
+                article.pop('content', None)
+                _summary_queue.put((article, summary_data))
+                handled.add(article['pr_id'])
+                continue
+        uncached.append((enqueued_at, article))
+    batch = uncached
+    if not batch:
+        return
+    articles = [article for _, article in batch]
+    try:
+        results = summarize_articles(articles)
+    except Exception as e:
+        for article in articles:
             logger.error(
                 "%s occurred while summarizing article %s: %s",
                 type(e), article['title'], e
             )
-            continue
-        logger.debug(f"Saving summary for article {article['title']}")
+            _fail(article['pr_id'], article['title'], e)
+            handled.add(article['pr_id'])
+        _record(failed=len(articles))
+        return
+    now = datetime.now(timezone.utc)
+    for (enqueued_at, article), summary_data in zip(batch, results):
+        logger.info(f"Article {article['title']} processed")
+        _record(summarized=1, latency=(now - enqueued_at).total_seconds())
+        if article.get('content_hash'):
+            _get_summary_cache().put(article['content_hash'], summary_data)
+        # the content isn't needed any more; don't hold it while queued
+        article.pop('content', None)
+        _summary_queue.put((article, summary_data))
+        handled.add(article['pr_id'])
+
+def _write_summaries():
+    """Writer loop: save finished summaries in groups.
+
+    Waits up to SUMMARY_WRITE_INTERVAL seconds (default 2) to collect up to
+    SUMMARY_WRITE_BATCH summaries (default 20) per transaction. Saving a
+    summary also removes its job from the queue; a summary lost before it is
+    saved is retried once its lease expires.
+    """
+    max_batch = int(os.getenv("SUMMARY_WRITE_BATCH", "20"))
+    interval = float(os.getenv("SUMMARY_WRITE_INTERVAL", "2"))
+    while True:
+        batch = [_summary_queue.get(True)]
+        deadline = time.monotonic() + interval
+        while len(batch) < max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(_summary_queue.get(True, remaining))
+            except Empty:
+                break
+        logger.debug(f"Saving {len(batch)} summaries")
+        rows = [
+            (article['pr_id'], summary_data['category'],
+             summary_data['sentiment'], summary_data['summary'],
+             datetime.now(), summary_data['model'],
+             json.dumps(summary_data['prompt']), article.get('content_hash'))
+            for article, summary_data in batch
+        ]
         try:
-            db.save_new_article_summary(
-                article['pr_id'], summary_data['category'],
-                summary_data['sentiment'], summary_data['summary'],
-                datetime.now(), summary_data['model'], 
-                json.dumps(summary_data['prompt'])
-            )
-            logger.info(f"Summary for {article['title']} saved")
+            results = db.save_new_article_summaries(rows)
         except Exception as e:
-            logger.error(
-                "%s occured while saving article %s. article not saved.",
-                type(e), article['title']
-            )
-            continue
+            results = [e] * len(rows)
+        for (article, _), result in zip(batch, results):
+            if isinstance(result, Exception):
+                logger.error(
+                    "%s occured while saving article %s. article not saved.",
+                    type(result), article['title']
+                )
+                _fail(article['pr_id'], article['title'], result)
+                _record(not_saved=1)
+            else:
+                logger.info(f"Summary for {article['title']} saved")
+                _record(saved=1)
+        logger.info(f"Summarization stats: {get_stats()}")
 
 PROMPT_TEMPLATE = """{}\n\nAnalyze the preceeding article and respond in the \
 following JSON format: {{\
@@ -56,33 +340,244 @@ following JSON format: {{\
 (Positive, Negative, Neutral)\
 }}"""
 
-def summarize_article(article: dict):
-    prepared_prompt = PROMPT_TEMPLATE.format(article['content'])
+BATCH_PROMPT_TEMPLATE = """{}\n\nAnalyze each of the preceeding {} articles \
+and respond with a JSON array holding one object per article, in the same \
+order, each in the following format: {{\
+"summary": a brief summary highlighting the key points of the article, \
+"subject": one or two words that describe the subject of the article \
+(Earnings, Clinical Trial, Regulatory Approval, or Other), \
+"sentiment": one word description of the overall sentiment of the article \
+(Positive, Negative, Neutral)\
+}}"""
+
+_inference_slots = None
+_inference_slots_lock = threading.Lock()
+
+def _get_inference_slots() -> threading.BoundedSemaphore:
+    """Semaphore shared by every caller in the process, so workers and the
+    chunks they fan out never have more than SUMMARIZER_WORKERS (default 2)
+    requests in flight between them."""
+    global _inference_slots
+    if _inference_slots is None:
+        with _inference_slots_lock:
+            if _inference_slots is None:
+                _inference_slots = threading.BoundedSemaphore(
+                    int(os.getenv("SUMMARIZER_WORKERS", "2")))
+    return _inference_slots
+
+def _post_inference(payload: dict) -> dict:
+    """POST a payload to INFERENCE_URL, retrying on 429, 5xx and connection
+    errors with exponential backoff and jitter.
+
+    Retries up to INFERENCE_RETRIES times (default 5), starting from
+    INFERENCE_BACKOFF seconds (default 1), each attempt timing out after
+    INFERENCE_TIMEOUT seconds (default 300). A Retry-After header is honoured.
+    INFERENCE_MODEL names the model the server runs; it is not sent, but
+    keys the content-hash summary cache, which is off while it is unset.
+    Each attempt holds one of the process's inference slots; backoff does
+    not.
+    """
+    retries = int(os.getenv("INFERENCE_RETRIES", "5"))
+    backoff = float(os.getenv("INFERENCE_BACKOFF", "1"))
+    timeout = float(os.getenv("INFERENCE_TIMEOUT", "300"))
+    for attempt in range(retries + 1):
+        delay = backoff * 2 ** attempt + random.uniform(0, backoff)
+        try:
+            with _get_inference_slots():
+                response = requests.post(os.getenv("INFERENCE_URL"), json=payload,
+                                         timeout=timeout)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            if attempt == retries:
+                raise
+            logger.warning(f"{type(e).__name__} calling inference server, "
+                           f"retrying in {delay:.1f}s")
+        else:
+            if response.status_code not in RETRY_STATUSES or attempt == retries:
+                response.raise_for_status()
+                return response.json()
+            retry_after = response.headers.get("Retry-After", "")
+            if retry_after.isdigit():
+                delay = max(delay, float(retry_after))
+            logger.warning(f"Inference server returned {response.status_code}, "
+                           f"retrying in {delay:.1f}s")
+        time.sleep(delay)
+
+CHUNK_PROMPT_TEMPLATE = """{}\n\nThe preceeding text is part {} of {} of a \
+press release. Summarize the key facts, figures and announcements in this \
+part in a few sentences. Respond with the summary text only."""
+
+REDUCE_PREAMBLE = """The following are summaries of consecutive parts of a \
+single press release.\n\n"""
+
+def _chunk_tokens() -> int:
+    """Token budget per prompt, from SUMMARY_CHUNK_TOKENS (default 6000)."""
+    return int(os.getenv("SUMMARY_CHUNK_TOKENS", "6000"))
+
+def _prepare_content(article: dict) -> str:
+    return chunking.strip_boilerplate(article['content'] or "")
+
+def _request_summary(content: str, max_new_tokens: int=1500) -> tuple:
+    """Ask for the JSON summary of content. Returns (reply, model)."""
     payload = {
-        "max_new_tokens": 1500,
+        "max_new_tokens": max_new_tokens,
         "messages": [{
             "role": "user",
-            "content": prepared_prompt,
+            "content": PROMPT_TEMPLATE.format(content),
         }]}
-    logger.info(f"Fetching summary for article {article['title']}")
-    response = requests.post(os.getenv("INFERENCE_URL"), json=payload)
-    response.raise_for_status()
-    response_body = response.json()
+    response_body = _post_inference(payload)
     reply = json.loads(response_body.get('reply', {}).get('content', ''))
+    return reply, response_body['model']
+
+def summarize_article(article: dict):
+    content = _prepare_content(article)
+    if chunking.estimate_tokens(content) > _chunk_tokens():
+        return summarize_long_article(article, content)
+    logger.info(f"Fetching summary for article {article['title']}")
+    reply, model = _request_summary(content)
+    logger.info(f"Summary received for article {article['title']}")
+    return {
+        "summary": reply['summary'],
+        "category": reply['subject'],
+        "sentiment": reply['sentiment'],
+        "model": model,
+        "prompt": {
+            "role": "user",
+            "content": PROMPT_TEMPLATE,
+        }
+    }
+
+def _summarize_chunk(chunk: str, part: int, parts: int) -> str:
+    payload = {
+        "max_new_tokens": 500,
+        "messages": [{
+            "role": "user",
+            "content": CHUNK_PROMPT_TEMPLATE.format(chunk, part, parts),
+        }]}
+    response_body = _post_inference(payload)
+    return response_body.get('reply', {}).get('content', '').strip()
+
+def summarize_long_article(article: dict, content: str=None):
+    """Summarize an article too long for one prompt by map-reduce.
+
+    The content is split into chunks of SUMMARY_CHUNK_TOKENS, which are
+    summarized concurrently (up to SUMMARY_CHUNK_CONCURRENCY at a time,
+    default 4, within the process-wide limit of SUMMARIZER_WORKERS
+    inference calls). If the partial summaries are still over budget they are
+    chunked and summarized again. The final prompt is the usual
+    PROMPT_TEMPLATE over the partial summaries, so the result has the same
+    shape as summarize_article's.
+    """
+    budget = _chunk_tokens()
+    concurrency = int(os.getenv("SUMMARY_CHUNK_CONCURRENCY", "4"))
+    text = content if content is not None else _prepare_content(article)
+    total_chunks = 0
+    for _ in range(3):
+        if chunking.estimate_tokens(text) <= budget:
+            break
+        chunks = chunking.split_chunks(text, budget)
+        total_chunks += len(chunks)
+        logger.info(f"Summarizing article {article['title']} in {len(chunks)} chunks")
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            partials = list(executor.map(
+                _summarize_chunk, chunks, range(1, len(chunks) + 1),
+                [len(chunks)] * len(chunks),
+            ))
+        text = "\n\n".join(
+            f"Part {i}: {partial}" for i, partial in enumerate(partials, start=1))
+    # partial summaries that refuse to shrink are cut to fit
+    text = text[:budget * chunking.CHARS_PER_TOKEN]
+    reply, model = _request_summary(REDUCE_PREAMBLE + text)
     logger.info(f"Summary received for article {article['title']}")
     return {
         "summary": reply['summary'],
         "category": reply['subject'],
         "sentiment": reply['sentiment'],
-        "model": response_body['model'],
+        "model": model,
         "prompt": {
             "role": "user",
             "content": PROMPT_TEMPLATE,
+            "chunk_prompt": CHUNK_PROMPT_TEMPLATE,
+            "chunks": total_chunks,
         }
     }
 
+def summarize_articles(articles: list) -> list:
+    """Summarize several articles, batching short ones into a single
+    inference call. Long articles are summarized individually.
+
+    Returns:
+        list: summary data for each article, in order
+    """
+    results = [None] * len(articles)
+    short = []
+    for i, article in enumerate(articles):
+        content = _prepare_content(article)
+        if chunking.estimate_tokens(content) > _chunk_tokens():
+            results[i] = summarize_long_article(article, content)
+        else:
+            short.append((i, article, content))
+    if len(short) == 1:
+        i, article, _ = short[0]
+        results[i] = summarize_article(article)
+    elif short:
+        batch = _summarize_batch([article for _, article, _ in short],
+                                 [content for _, _, content in short])
+        for (i, _, _), summary_data in zip(short, batch):
+            results[i] = summary_data
+    return results
+
+def _summarize_batch(articles: list, contents: list) -> list:
+    """Summarize several articles with a single inference call.
+
+    Falls back to one call per article if the reply cannot be matched up
+    with the articles.
+    """
+    combined = "\n\n".join(
+        f"### Article {i}\n\n{content}"
+        for i, content in enumerate(contents, start=1)
+    )
+    payload = {
+        "max_new_tokens": 1500 * len(articles),
+        "messages": [{
+            "role": "user",
+            "content": BATCH_PROMPT_TEMPLATE.format(combined, len(articles)),
+        }]}
+    logger.info(f"Fetching summaries for {len(articles)} articles")
+    response_body = _post_inference(payload)
+    try:
+        replies = json.loads(response_body.get('reply', {}).get('content', ''))
+        if not isinstance(replies, list) or len(replies) != len(articles):
+            raise ValueError(f"expected {len(articles)} summaries")
+        return [
+            {
+                "summary": reply['summary'],
+                "category": reply['subject'],
+                "sentiment": reply['sentiment'],
+                "model": response_body['model'],
+                "prompt": {
+                    "role": "user",
+                    "content": BATCH_PROMPT_TEMPLATE,
+                }
+            }
+            for reply in replies
+        ]
+    except (ValueError, KeyError, TypeError) as e:
+        logger.warning(f"Unusable batch reply ({e}), summarizing individually")
+        return [summarize_article(article) for article in articles]
+
 def queue_unsummarized_articles():
-    articles = db.get_unsummarized_articles()
-    logger.info(f"Queuing {len(articles)} unsummarized articles")
-    for article in articles:
-        queue_article(article)
+    """Queue every article lacking a summary, streaming the IDs from the
+    database in chunks of DB_ITERSIZE."""
+    chunk_size = int(os.getenv("DB_ITERSIZE", "500"))
+    found = queued = 0
+    chunk = []
+    for article in db.get_unsummarized_articles(include_content=False,
+                                                itersize=chunk_size):
+        chunk.append(article['pr_id'])
+        if len(chunk) >= chunk_size:
+            found += len(chunk)
+            queued += db.enqueue_summary_jobs(chunk)
+            chunk = []
+    found += len(chunk)
+    queued += db.enqueue_summary_jobs(chunk)
+    logger.info(f"Queued {queued} of {found} unsummarized articles")
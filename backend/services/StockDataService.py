@@ -1,12 +1,279 @@
+"""Daily price history, served from a local store kept up to date incrementally.
+
+Bars live in investing.price_history. Reads go through a short in-memory TTL
+cache; on a miss, bars from the last stored date on are fetched from the
+upstream data source, stored, and the requested window is read back. Bars
+are adjusted for splits and dividends, so a symbol's stored history is
+replaced when a new corporate action changes the adjustments.
+
+A prefetch job refreshes the whole watchlist in bulk after each market
+close, so requests during the day normally never reach the upstream.
+"""
+import datetime
 import logging
+import math
+import os
+import threading
+import time
+from zoneinfo import ZoneInfo
 
+import pandas as pd
 import yfinance as yf
 
+from services import db
+
 logger = logging.getLogger(__name__)
 
+PRICE_COLUMNS = ["Open", "High", "Low", "Close", "Volume"]
+HISTORY_DAYS = 365
+MARKET_TIMEZONE = ZoneInfo("America/New_York")
+# relative change in a stored close taken to mean the upstream adjusted it
+ADJUSTMENT_TOLERANCE = 1e-4
+
+
+class PriceDataSource:
+    """Upstream source of daily OHLCV bars. Subclass to plug in another
+    provider, or a local fake for tests, and install it with set_data_source."""
+
+    def fetch(self, symbols: list, start: datetime.date=None) -> list:
+        """Fetch daily bars.
+
+        Args:
+            symbols (list): stock symbols
+            start (datetime.date, optional): first date to fetch; if None,
+                fetch the last year
+
+        Returns:
+            list: (symbol, date, open, high, low, close, volume) tuples
+        """
+        raise NotImplementedError
+
+
+class YahooDataSource(PriceDataSource):
+    """Daily bars from Yahoo Finance via yfinance."""
+
+    def fetch(self, symbols: list, start: datetime.date=None) -> list:
+        window = {"start": start} if start else {"period": "1y"}
+        data = yf.download(list(symbols), group_by="ticker", interval="1d",
+                           auto_adjust=True, progress=False, **window)
+        bars = []
+        if data is None or data.empty:
+            return bars
+        for symbol in symbols:
+            if symbol not in data.columns.get_level_values(0):
+                continue
+            frame = data[symbol].dropna(subset=["Close"])
+            for date, row in zip(frame.index, frame[PRICE_COLUMNS].itertuples(index=False)):
+                volume = int(row.Volume) if pd.notna(row.Volume) else None
+                bars.append((symbol, date.date(), float(row.Open), float(row.High),
+                             float(row.Low), float(row.Close), volume))
+        return bars
+
+_data_source = None
+_memory_cache = {}  # symbol -> (expires_at, DataFrame)
+_memory_cache_lock = threading.Lock()
+_refresh_attempts = {}  # symbol -> monotonic time of last upstream refresh
+_refresh_attempts_lock = threading.Lock()
+
+def set_data_source(source: PriceDataSource):
+    """Replace the upstream data source, clearing the in-memory cache."""
+    global _data_source
+    _data_source = source
+    with _memory_cache_lock:
+        _memory_cache.clear()
+
+def get_data_source() -> PriceDataSource:
+    global _data_source
+    if _data_source is None:
+        _data_source = YahooDataSource()
+    return _data_source
+
+def get_market_close() -> datetime.time:
+    """Time of day (exchange time) after which the day's bar is final, from
+    PRICE_PREFETCH_TIME (default 16:30)."""
+    return datetime.time.fromisoformat(os.getenv("PRICE_PREFETCH_TIME", "16:30"))
+
+def last_session_date(now: datetime.datetime=None) -> datetime.date:
+    """Date of the most recent trading session with a final daily bar.
+
+    Weekends are skipped; exchange holidays are not known, so on those days
+    the store looks one day stale and refresh attempts are throttled instead.
+    """
+    now = now or datetime.datetime.now(MARKET_TIMEZONE)
+    date = now.date()
+    if now.time() < get_market_close():
+        date -= datetime.timedelta(days=1)
+    while date.weekday() >= 5:
+        date -= datetime.timedelta(days=1)
+    return date
+
+def _price_changed(fetched: float, stored: float) -> bool:
+    return stored is None or not math.isclose(fetched, stored, rel_tol=ADJUSTMENT_TOLERANCE)
+
+def refresh(symbols: list, force: bool=False) -> int:
+    """Fetch bars from the last stored date on for each symbol and store
+    them. Symbols with nothing stored get a full year.
+
+    Only final bars are stored: a bar for a session still in progress is
+    dropped. The last stored bar is fetched again; bars are split- and
+    dividend-adjusted, so if its close has changed the adjustments have,
+    and the symbol's whole stored history is fetched again and replaced.
+
+    Symbols already holding the last session's bar are skipped, as are
+    symbols refreshed within PRICE_REFRESH_INTERVAL seconds (default 3600)
+    unless force is set.
+
+    Returns:
+        int: number of bars written
+    """
+    now = time.monotonic()
+    interval = float(os.getenv("PRICE_REFRESH_INTERVAL", "3600"))
+    with _refresh_attempts_lock:
+        if not force:
+            symbols = [s for s in symbols
+                       if now - _refresh_attempts.get(s, -interval) >= interval]
+        for symbol in symbols:
+            _refresh_attempts[symbol] = now
+    if not symbols:
+        return 0
+    extents = db.get_price_extents(symbols)
+    up_to_date = last_session_date()
+    new_symbols = [s for s in symbols if s not in extents]
+    known_symbols = [s for s in symbols
+                     if s in extents and extents[s][1] < up_to_date]
+    bars = []
+    readjusted = set()
+    if new_symbols:
+        logger.info(f"Fetching a year of price history for {new_symbols}")
+        bars += get_data_source().fetch(new_symbols)
+    if known_symbols:
+        start = min(extents[s][1] for s in known_symbols)
+        logger.info(f"Fetching price history since {start} for {known_symbols}")
+        for bar in get_data_source().fetch(known_symbols, start):
+            _, last_date, last_close = extents[bar[0]]
+            if bar[1] == last_date and _price_changed(bar[5], last_close):
+                readjusted.add(bar[0])
+            if bar[1] >= last_date:
+                bars.append(bar)
+    bars = [bar for bar in bars if bar[1] <= up_to_date and bar[0] not in readjusted]
+    written = db.save_price_history(bars)
+    if readjusted:
+        readjusted = sorted(readjusted)
+        start = min(extents[s][0] for s in readjusted)
+        logger.info(f"Stored prices for {readjusted} no longer match upstream "
+                    f"adjustments; fetching them again since {start}")
+        fresh = [bar for bar in get_data_source().fetch(readjusted, start)
+                 if bar[1] <= up_to_date]
+        # never wipe a symbol's history because the upstream returned nothing
+        fetched = sorted({bar[0] for bar in fresh})
+        if fetched:
+            written += db.replace_price_history(fetched, fresh)
+    logger.info(f"Stored {written} new bars for {symbols}")
+    return written
+
+def _load_frames(symbols: list) -> dict:
+    start = datetime.date.today() - datetime.timedelta(days=HISTORY_DAYS)
+    rows = db.get_price_history(symbols, start)
+    frame = pd.DataFrame(rows, columns=["Ticker", "Date"] + PRICE_COLUMNS)
+    frame["Date"] = pd.to_datetime(frame["Date"])
+    frames = {}
+    for symbol in symbols:
+        df = frame[frame["Ticker"] == symbol].set_index("Date")[PRICE_COLUMNS]
+        frames[symbol] = df
+    return frames
+
+def get_price_frames(symbols: list) -> dict:
+    """Get a year of daily bars per symbol, refreshing stale symbols.
+
+    Frames are kept in memory for PRICE_CACHE_TTL seconds (default 300). If
+    the refresh fails, whatever is stored is served and kept for only
+    PRICE_STALE_CACHE_TTL seconds (default 30), so a later request retries.
+
+    Returns:
+        dict: symbol -> DataFrame indexed by Date with PRICE_COLUMNS
+    """
+    now = time.monotonic()
+    frames = {}
+    with _memory_cache_lock:
+        for symbol in symbols:
+            cached = _memory_cache.get(symbol)
+            if cached and cached[0] > now:
+                frames[symbol] = cached[1]
+    missing = [s for s in symbols if s not in frames]
+    if missing:
+        ttl = float(os.getenv("PRICE_CACHE_TTL", "300"))
+        try:
+            refresh(missing)
+        except Exception as e:
+            logger.error(f"{type(e).__name__} occurred while refreshing prices for {missing}: {e}")
+            ttl = min(ttl, float(os.getenv("PRICE_STALE_CACHE_TTL", "30")))
+        loaded = _load_frames(missing)
+        expires_at = time.monotonic() + ttl
+        with _memory_cache_lock:
+            for symbol, df in loaded.items():
+                _memory_cache[symbol] = (expires_at, df)
+        frames.update(loaded)
+    return frames
+
 def fetch_price_history(symbol: (str | list | tuple)):
     logger.info(f"Fetching price history for {symbol}")
-    data = yf.download(symbol, period="1y", group_by="ticker", interval="1d",
-                       auto_adjust=True)
+    symbols = [symbol] if isinstance(symbol, str) else list(symbol)
+    symbols = [s.upper() for s in symbols]
+    frames = get_price_frames(symbols)
+    data = pd.concat([frames[s] for s in symbols], axis=1, keys=symbols,
+                     names=["Ticker", "Price"])
+    data.index.name = "Date"
     logger.info(f"Fetched {len(data)} days price data for {symbol}")
     return data
+
+def prefetch_watchlist() -> int:
+    """Refresh the store for every actively watched symbol, in bulk requests
+    of PRICE_PREFETCH_CHUNK symbols (default 50).
+
+    Returns:
+        int: number of bars written
+    """
+    symbols = [s.upper() for s in db.get_watch_list()]
+    chunk_size = int(os.getenv("PRICE_PREFETCH_CHUNK", "50"))
+    written = 0
+    for i in range(0, len(symbols), chunk_size):
+        chunk = symbols[i:i + chunk_size]
+        try:
+            written += refresh(chunk, force=True)
+        except Exception as e:
+            logger.error(f"{type(e).__name__} occurred while prefetching prices "
+                         f"for {chunk}: {e}")
+        with _memory_cache_lock:
+            for symbol in chunk:
+                _memory_cache.pop(symbol, None)
+    logger.info(f"Prefetched {written} bars for {len(symbols)} watched symbols")
+    return written
+
+def next_prefetch_time(now: datetime.datetime=None) -> datetime.datetime:
+    """Next weekday market close (see get_market_close) after now."""
+    now = now or datetime.datetime.now(MARKET_TIMEZONE)
+    candidate = datetime.datetime.combine(now.date(), get_market_close(),
+                                          tzinfo=MARKET_TIMEZONE)
+    while candidate <= now or candidate.weekday() >= 5:
+        candidate = datetime.datetime.combine(
+            candidate.date() + datetime.timedelta(days=1), get_market_close(),
+            tzinfo=MARKET_TIMEZONE)
+    return candidate
+
+def run_prefetch_loop():
+    """Warm the price store now, then again after every market close."""
+    while True:
+        try:
+            prefetch_watchlist()
+        except Exception as e:
+            logger.error(f"Unexpected {type(e).__name__} occurred while "
+                         f"prefetching prices: {e}")
+        next_time = next_prefetch_time()
+        wait_time = (next_time - datetime.datetime.now(MARKET_TIMEZONE)).total_seconds()
+        logger.info("Next price prefetch in %ds at %s", wait_time, next_time.isoformat())
+        time.sleep(max(wait_time, 0))
+
+def start():
+    """Start the price prefetch job."""
+    logger.info("Starting Price Prefetch Service")
+    run_prefetch_loop()
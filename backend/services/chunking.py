@@ -0,0 +1,85 @@
+"""Prepare long press release markdown for summarization.
+
+PDF conversions of long filings are full of repeated page headers and
+footers and legal boilerplate, and are often too long for one prompt.
+These helpers strip the noise and split what is left into chunks that fit
+a token budget.
+"""
+from collections import Counter
+import re
+
+# rough characters per token for English prose
+CHARS_PER_TOKEN = 4
+
+BOILERPLATE_HEADINGS = re.compile(
+    r"forward[- ]looking statements?|safe harbor|cautionary (note|statement)|"
+    r"investor contacts?|media contacts?|investor relations contacts?",
+    re.I,
+)
+_HEADING = re.compile(r"^\s*(#{1,6}\s+(?P<md>.+?)|\*\*(?P<bold>[^*]{1,120})\*\*:?)\s*$")
+_PAGE_NUMBER = re.compile(r"^\s*(page\s+)?\d+(\s+of\s+\d+)?\s*$", re.I)
+_PAGE_BREAK = re.compile(r"^\s*-{5,}\s*$")
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+def _heading(line: str):
+    match = _HEADING.match(line)
+    if not match:
+        return None
+    return (match.group("md") or match.group("bold")).strip()
+
+def strip_boilerplate(markdown: str, min_repeats: int=3) -> str:
+    """Remove page furniture and legal boilerplate from converted markdown.
+
+    Drops page breaks, page numbers, short lines repeated on at least
+    min_repeats pages (running headers and footers), and whole sections
+    headed "Forward-Looking Statements", "Safe Harbor", contacts and the like.
+    """
+    lines = markdown.splitlines()
+    counts = Counter(line.strip() for line in lines
+                     if line.strip() and len(line.strip()) <= 120)
+    repeated = {line for line, n in counts.items()
+                if n >= min_repeats and not _heading(line)}
+
+    kept = []
+    in_boilerplate = False
+    for line in lines:
+        heading = _heading(line)
+        if heading is not None:
+            in_boilerplate = bool(BOILERPLATE_HEADINGS.search(heading))
+        if in_boilerplate:
+            continue
+        stripped = line.strip()
+        if (_PAGE_BREAK.match(line) or _PAGE_NUMBER.match(line)
+                or stripped in repeated):
+            continue
+        kept.append(line)
+    # collapse the blank runs left behind
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(kept)).strip()
+
+def split_chunks(text: str, max_tokens: int) -> list:
+    """Split text into chunks of at most max_tokens (estimated), breaking
+    between paragraphs where possible, then between lines, then anywhere."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        for line in paragraph.splitlines():
+            pieces.extend(line[i:i + max_chars] for i in range(0, len(line), max_chars))
+
+    chunks = []
+    current = []
+    size = 0
+    for piece in pieces:
+        if current and size + len(piece) + 2 > max_chars:
+            chunks.append("\n\n".join(current))
+            current = []
+            size = 0
+        current.append(piece)
+        size += len(piece) + 2
+    if current:
+        chunks.append("\n\n".join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
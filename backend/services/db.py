@@ -1,7 +1,11 @@
 """Collection of functions to write to and read from the database."""
 import os
+import threading
 
 import psycopg2
+from psycopg2.extras import execute_values
+
+from services.db_pool import ConnectionPool
 
 def get_connection_info() -> dict:
     return {
@@ -13,8 +17,61 @@ def get_connection_info() -> dict:
     }
 
 def get_connection() -> psycopg2.extensions.connection:
+    """Open a new, unpooled connection. Use ``connection()`` instead."""
     return psycopg2.connect(**get_connection_info())
 
+_pool = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ConnectionPool:
+    """Return the process-wide connection pool, creating it on first use.
+
+    Pool size and behaviour are configured with the DB_POOL_MIN_SIZE,
+    DB_POOL_MAX_SIZE, DB_POOL_TIMEOUT and DB_POOL_HEALTH_CHECK_INTERVAL
+    environment variables.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    get_connection,
+                    min_size=int(os.getenv("DB_POOL_MIN_SIZE", "1")),
+                    max_size=int(os.getenv("DB_POOL_MAX_SIZE", "10")),
+                    timeout=float(os.getenv("DB_POOL_TIMEOUT", "30")),
+                    health_check_interval=float(
+                        os.getenv("DB_POOL_HEALTH_CHECK_INTERVAL", "60")),
+                )
+    return _pool
+
+# channel carrying "<kind>:<SYMBOL>" payloads whenever cached API responses
+# for a symbol go stale. kind is "articles" or "prices"
+INVALIDATION_CHANNEL = "pharmawatch_invalidate"
+
+def _notify_changed(cursor, kind: str, symbols):
+    """Queue an invalidation notice per symbol. Postgres delivers NOTIFY on
+    commit, so listeners never hear about writes that were rolled back."""
+    payloads = sorted({f"{kind}:{symbol.upper()}" for symbol in symbols})
+    if payloads:
+        cursor.execute("SELECT pg_notify(%s, p) FROM unnest(%s::text[]) AS p;",
+                       (INVALIDATION_CHANNEL, payloads))
+
+def _refresh_catalysts(cursor, days):
+    """Recompute investing.catalyst_daily for (symbol, date) pairs, in the
+    caller's transaction."""
+    days = set(days)
+    if days:
+        symbols, dates = zip(*days)
+        cursor.execute("SELECT investing.refresh_catalyst_days(%s::text[], %s::date[]);",
+                       (list(symbols), list(dates)))
+
+def connection():
+    """Context manager checking a connection out of the shared pool.
+
+    Commits on success, rolls back on error and always returns the connection.
+    """
+    return get_pool().connection()
+
 def get_article(id_or_symbol: (str | int), title: str=None):
     """Retrieve a news article from the database.
 
@@ -26,22 +83,20 @@ def get_article(id_or_symbol: (str | int), title: str=None):
     Returns:
         dict: article data, or None if not found
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    if title is None:
-        cursor.execute("""
-            SELECT id, symbol, date, title, content_type, content, url, retrieved_ts
-            FROM investing.press_release
-            WHERE id = %s;
-        """, (id_or_symbol,))
-    else:
-        cursor.execute("""
-            SELECT id, symbol, date, title, content_type, content, url, retrieved_ts
-            FROM investing.press_release
-            WHERE symbol = %s AND title = %s;
-        """, (id_or_symbol, title))
-    row = cursor.fetchone()
-    cursor.close()
+    with connection() as conn, conn.cursor() as cursor:
+        if title is None:
+            cursor.execute("""
+                SELECT id, symbol, date, title, content_type, content, url, retrieved_ts
+                FROM investing.press_release
+                WHERE id = %s;
+            """, (id_or_symbol,))
+        else:
+            cursor.execute("""
+                SELECT id, symbol, date, title, content_type, content, url, retrieved_ts
+                FROM investing.press_release
+                WHERE symbol = %s AND title = %s;
+            """, (id_or_symbol, title))
+        row = cursor.fetchone()
     if row:
         return {
             "pr_id": row[0],
@@ -66,32 +121,30 @@ def get_article_with_summary(id_or_symbol: (str | int), title: str=None):
     Returns:
         dict: article data with summary, or None if not found
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    if title is None:
-        cursor.execute("""
-            SELECT pr.id, pr.symbol, pr.date, pr.title, pr.content_type,
-                   pr.content, pr.url, pr.retrieved_ts,
-                   ps.id, ps.category, ps.sentiment, ps.summary,
-                   ps.timestamp, ps.model_used, ps.prompt
-            FROM investing.press_release pr
-            LEFT JOIN investing.pr_summary ps ON pr.id = ps.pr_id
-            WHERE pr.id = %s;
-            ORDER BY ps.timestamp DESC LIMIT 1;
-        """, (id_or_symbol,))
-    else:
-        cursor.execute("""
-            SELECT pr.id, pr.symbol, pr.date, pr.title, pr.content_type,
-                   pr.content, pr.url, pr.retrieved_ts,
-                   ps.id, ps.category, ps.sentiment, ps.summary,
-                   ps.timestamp, ps.model_used, ps.prompt
-            FROM investing.press_release pr
-            LEFT JOIN investing.pr_summary ps ON pr.id = ps.pr_id
-            WHERE pr.symbol = %s AND pr.title = %s
-            ORDER BY ps.timestamp DESC LIMIT 1;
-        """, (id_or_symbol, title))
-    row = cursor.fetchone()
-    cursor.close()
+    with connection() as conn, conn.cursor() as cursor:
+        if title is None:
+            cursor.execute("""
+                SELECT pr.id, pr.symbol, pr.date, pr.title, pr.content_type,
+                       pr.content, pr.url, pr.retrieved_ts,
+                       ps.id, ps.category, ps.sentiment, ps.summary,
+                       ps.timestamp, ps.model_used, ps.prompt
+                FROM investing.press_release pr
+                LEFT JOIN investing.pr_summary ps ON pr.id = ps.pr_id
+                WHERE pr.id = %s
+                ORDER BY ps.timestamp DESC LIMIT 1;
+            """, (id_or_symbol,))
+        else:
+            cursor.execute("""
+                SELECT pr.id, pr.symbol, pr.date, pr.title, pr.content_type,
+                       pr.content, pr.url, pr.retrieved_ts,
+                       ps.id, ps.category, ps.sentiment, ps.summary,
+                       ps.timestamp, ps.model_used, ps.prompt
+                FROM investing.press_release pr
+                LEFT JOIN investing.pr_summary ps ON pr.id = ps.pr_id
+                WHERE pr.symbol = %s AND pr.title = %s
+                ORDER BY ps.timestamp DESC LIMIT 1;
+            """, (id_or_symbol, title))
+        row = cursor.fetchone()
     if row:
         return {
             "pr_id": row[0],
@@ -112,57 +165,336 @@ def get_article_with_summary(id_or_symbol: (str | int), title: str=None):
         }
     return None
 
+# Columns selectable by iter_articles_with_summaries, keyed by output field name
+ARTICLE_FIELDS = {
+    "pr_id": "pr.id",
+    "symbol": "pr.symbol",
+    "date": "pr.date",
+    "title": "pr.title",
+    "content_type": "pr.content_type",
+    "content": "pr.content",
+    "document_url": "pr.url",
+    "retrieved_ts": "pr.retrieved_ts",
+    "summary_id": "ps.id",
+    "category": "ps.category",
+    "sentiment": "ps.sentiment",
+    "summary": "ps.summary",
+    "timestamp": "ps.timestamp",
+    "model_used": "ps.model_used",
+    "prompt": "ps.prompt",
+}
+
+def iter_articles_with_summaries(symbol: str, fields=None, limit: int=None,
+                                 after: tuple=None, itersize: int=100):
+    """Stream a symbol's articles joined to their latest summaries.
+
+    Articles are ordered newest first by (date, id), which also serves as the
+    keyset for pagination. Rows are read through a server-side cursor, so
+    memory use is bounded by itersize rather than the size of the history.
+
+    Args:
+        symbol (str): the stock symbol
+        fields (iterable, optional): names from ARTICLE_FIELDS to include.
+            defaults to all fields
+        limit (int, optional): maximum number of articles to return
+        after (tuple, optional): (date, pr_id) of the last article of the
+            previous page; only older articles are returned
+        itersize (int, optional): rows fetched per round trip
+
+    Yields:
+        dict: article data with summary fields
+    """
+    fields = list(fields or ARTICLE_FIELDS)
+    unknown = [f for f in fields if f not in ARTICLE_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown article fields: {', '.join(unknown)}")
+    columns = ", ".join(ARTICLE_FIELDS[f] for f in fields)
+    query = f"""
+        SELECT {columns}
+        FROM investing.press_release pr
+        LEFT JOIN LATERAL (
+            SELECT id, category, sentiment, summary, timestamp,
+                   model_used, prompt
+            FROM investing.pr_summary
+            WHERE pr_id = pr.id
+            ORDER BY timestamp DESC LIMIT 1
+        ) ps ON TRUE
+        WHERE pr.symbol = %s
+    """
+    params = [symbol]
+    if after is not None:
+        query += " AND (pr.date, pr.id) < (%s, %s)"
+        params.extend(after)
+    query += " ORDER BY pr.date DESC, pr.id DESC"
+    if limit is not None:
+        query += " LIMIT %s"
+        params.append(limit)
+
+    with connection() as conn, conn.cursor(name="articles_with_summaries") as cursor:
+        cursor.itersize = itersize
+        cursor.execute(query, params)
+        for row in cursor:
+            yield dict(zip(fields, row))
+
+HEADLINE_OPTIONS = "MaxFragments=2, MinWords=10, MaxWords=30, StartSel=<mark>, StopSel=</mark>"
+# content past this is not in search_vector (see migration 0006), so
+# snippets never need to parse beyond it
+SEARCH_CONTENT_CHARS = 500000
+
+def search_articles(query: str, symbol: str=None, start=None, end=None,
+                    limit: int=20, after: tuple=None) -> list:
+    """Full-text search of article titles and content.
+
+    The query uses web search syntax: quoted phrases, OR, and -term to
+    exclude. Matches come from the GIN index on press_release.search_vector
+    and are ranked by ts_rank_cd. Snippets are only built for the returned
+    page, since ts_headline has to re-parse each document, and only from the
+    part of the content that is indexed.
+
+    Args:
+        query (str): the search terms
+        symbol (str, optional): only search this symbol's articles
+        start (datetime.date, optional): earliest article date
+        end (datetime.date, optional): latest article date
+        limit (int, optional): maximum number of results
+        after (tuple, optional): (rank, pr_id) of the last result of the
+            previous page; only lower-ranked results are returned
+
+    Returns:
+        list: dicts with pr_id, symbol, date, title, document_url, rank and
+        snippet (content fragments with matches wrapped in <mark> tags),
+        best match first
+    """
+    conditions = ["pr.search_vector @@ q.query"]
+    params = [query]
+    if symbol is not None:
+        conditions.append("pr.symbol = %s")
+        params.append(symbol)
+    if start is not None:
+        conditions.append("pr.date >= %s")
+        params.append(start)
+    if end is not None:
+        conditions.append("pr.date <= %s")
+        params.append(end)
+    page_condition = ""
+    if after is not None:
+        page_condition = "WHERE (rank, id) < (%s, %s)"
+        params.extend(after)
+    params.extend([limit, SEARCH_CONTENT_CHARS, HEADLINE_OPTIONS])
+    with connection() as conn, conn.cursor() as cursor:
+        cursor.execute(f"""
+            WITH q AS (SELECT websearch_to_tsquery('english', %s) AS query),
+            matches AS (
+                SELECT pr.id, ts_rank_cd(pr.search_vector, q.query)::float8 AS rank
+                FROM investing.press_release pr, q
+                WHERE {" AND ".join(conditions)}
+            ),
+            page AS (
+                SELECT id, rank FROM matches
+                {page_condition}
+                ORDER BY rank DESC, id DESC
+                LIMIT %s
+            )
+            SELECT pr.id, pr.symbol, pr.date, pr.title, pr.url, page.rank,
+                   ts_headline('english', left(coalesce(pr.content, ''), %s),
+                               q.query, %s)
+            FROM page
+            JOIN investing.press_release pr ON pr.id = page.id, q
+            ORDER BY page.rank DESC, page.id DESC;
+        """, params)
+        rows = cursor.fetchall()
+    return [{
+        "pr_id": row[0],
+        "symbol": row[1],
+        "date": row[2],
+        "title": row[3],
+        "document_url": row[4],
+        "rank": row[5],
+        "snippet": row[6],
+    } for row in rows]
+
+def get_catalysts(symbol: str, start=None, end=None) -> list:
+    """Get a symbol's per-day article and sentiment rollup.
+
+    Args:
+        symbol (str): the stock symbol
+        start (datetime.date, optional): earliest date
+        end (datetime.date, optional): latest date
+
+    Returns:
+        list: dicts with date, article_count, summarized_count,
+        positive_count, negative_count, neutral_count, categories and
+        titles, oldest first
+    """
+    with connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT date, article_count, summarized_count, positive_count,
+                   negative_count, neutral_count, categories, titles
+            FROM investing.catalyst_daily
+            WHERE symbol = %s
+              AND date >= coalesce(%s, '-infinity'::date)
+              AND date <= coalesce(%s, 'infinity'::date)
+            ORDER BY date;
+        """, (symbol, start, end))
+        rows = cursor.fetchall()
+    return [{
+        "date": row[0],
+        "article_count": row[1],
+        "summarized_count": row[2],
+        "positive_count": row[3],
+        "negative_count": row[4],
+        "neutral_count": row[5],
+        "categories": row[6],
+        "titles": row[7],
+    } for row in rows]
+
+def get_latest_article_ids(symbol: str) -> tuple:
+    """Get the newest article and summary IDs for a symbol, which change
+    whenever its news does.
+
+    Returns:
+        tuple: (article ID, summary ID), each None if there are none
+    """
+    with connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT max(pr.id), max(ps.id)
+            FROM investing.press_release pr
+            LEFT JOIN investing.pr_summary ps ON ps.pr_id = pr.id
+            WHERE pr.symbol = %s;
+        """, (symbol,))
+        return cursor.fetchone()
+
+def get_catalyst_days(symbols, start=None) -> list:
+    """Get the news days of many symbols at once, for event studies.
+
+    Args:
+        symbols (list): stock symbols
+        start (datetime.date, optional): earliest date
+
+    Returns:
+        list: (symbol, date, article_count, positive_count, negative_count)
+        tuples
+    """
+    with connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT symbol, date, article_count, positive_count, negative_count
+            FROM investing.catalyst_daily
+            WHERE symbol = ANY(%s)
+              AND date >= coalesce(%s, '-infinity'::date)
+            ORDER BY symbol, date;
+        """, (list(symbols), start))
+        return cursor.fetchall()
+
 def get_titles_for_symbol(symbol: str):
-    """Get a list of (title, date) tuples for the given symbol."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT title, date
-        FROM investing.press_release
-        WHERE symbol = %s;
-    """, (symbol,))
-    titles = [(row[0], row[1]) for row in cursor.fetchall()]
-    cursor.close()
+    """Get a list of the titles of the given symbol's articles."""
+    with connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT title
+            FROM investing.press_release
+            WHERE symbol = %s;
+        """, (symbol,))
+        titles = [row[0] for row in cursor.fetchall()]
     return titles
 
-def get_unsummarized_articles():
-    """Get a list of articles that do not yet have summaries."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT pr.id, pr.symbol, pr.date, pr.title, pr.content_type,
-               pr.content, pr.url, pr.retrieved_ts
-        FROM investing.press_release pr
-        LEFT JOIN investing.pr_summary ps ON pr.id = ps.pr_id
-        WHERE ps.id IS NULL;
-    """)
-    articles = []
-    for row in cursor.fetchall():
-        articles.append({
-            "pr_id": row[0],
-            "symbol": row[1],
-            "date": row[2],
-            "title": row[3],
-            "content_type": row[4],
-            "content": row[5],
-            "document_url": row[6],
-            "retrieved_ts": row[7],
-        })
-    cursor.close()
-    return articles
+def get_unsummarized_articles(include_content: bool=True, itersize: int=None):
+    """Iterate over articles that do not yet have summaries.
+
+    Rows are streamed through a named server-side cursor, itersize at a
+    time, so memory use does not grow with the number of articles.
+
+    Args:
+        include_content (bool, optional): whether to load the content
+            column. skip it when only the article IDs are needed
+        itersize (int, optional): rows fetched per round trip, defaults to
+            DB_ITERSIZE or 500
+
+    Yields:
+        dict: article data
+    """
+    itersize = itersize or int(os.getenv("DB_ITERSIZE", "500"))
+    content = "pr.content" if include_content else "NULL"
+    with connection() as conn, conn.cursor(name="unsummarized_articles") as cursor:
+        cursor.itersize = itersize
+        cursor.execute(f"""
+            SELECT pr.id, pr.symbol, pr.date, pr.title, pr.content_type,
+                   {content}, pr.url, pr.retrieved_ts
+            FROM investing.press_release pr
+            WHERE NOT EXISTS (
+                SELECT 1 FROM investing.pr_summary ps WHERE ps.pr_id = pr.id
+            );
+        """)
+        for row in cursor:
+            yield {
+                "pr_id": row[0],
+                "symbol": row[1],
+                "date": row[2],
+                "title": row[3],
+                "content_type": row[4],
+                "content": row[5],
+                "document_url": row[6],
+                "retrieved_ts": row[7],
+            }
 
 def get_watch_list():
     """Get the list of symbols being actively monitored."""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT symbol FROM investing.watchlist
-        WHERE active;
-    """)
-    watchlist = [row[0] for row in cursor.fetchall()]
-    cursor.close()
+    with connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT symbol FROM investing.watchlist
+            WHERE active;
+        """)
+        watchlist = [row[0] for row in cursor.fetchall()]
     return watchlist
 
+def _insert_many(cursor, table: str, columns: tuple, rows: list,
+                 conflict: tuple=None) -> list:
+    """Insert rows with one multi-row INSERT, falling back to row-by-row.
+
+    If the multi-row INSERT fails, each row is retried under its own
+    savepoint so one bad row does not stop the rest from being saved.
+
+    Args:
+        conflict (tuple, optional): columns of a unique index. rows
+            duplicating an existing row (or an earlier row of the batch) on
+            these columns are skipped instead of failing
+
+    Returns:
+        list: for each row, in order, the new record's ID, None if it was
+        skipped as a duplicate, or the exception that prevented it from
+        being inserted
+    """
+    insert = f"INSERT INTO {table} ({', '.join(columns)}) VALUES"
+    returning = " RETURNING id;"
+    if conflict:
+        returning = (f" ON CONFLICT ({', '.join(conflict)}) DO NOTHING"
+                     f" RETURNING id, {', '.join(conflict)};")
+        key_indexes = [columns.index(c) for c in conflict]
+    cursor.execute("SAVEPOINT batch_insert;")
+    try:
+        ids = execute_values(cursor, insert + " %s" + returning, rows,
+                             page_size=len(rows), fetch=True)
+        cursor.execute("RELEASE SAVEPOINT batch_insert;")
+        if not conflict:
+            return [row[0] for row in ids]
+        # RETURNING skips conflicting rows, so match ids back up by key
+        inserted = {tuple(row[1:]): row[0] for row in ids}
+        return [inserted.pop(tuple(row[i] for i in key_indexes), None) for row in rows]
+    except psycopg2.Error:
+        cursor.execute("ROLLBACK TO SAVEPOINT batch_insert;")
+
+    placeholders = ", ".join(["%s"] * len(columns))
+    results = []
+    for row in rows:
+        cursor.execute("SAVEPOINT row_insert;")
+        try:
+            cursor.execute(insert + f" ({placeholders})" + returning, row)
+            inserted = cursor.fetchone()
+            results.append(inserted[0] if inserted else None)
+            cursor.execute("RELEASE SAVEPOINT row_insert;")
+        except psycopg2.Error as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT row_insert;")
+            results.append(e)
+    return results
+
 def save_new_article(symbol, date, title, content_type, content, url, retrieved_ts):
     """Save an article to the database. Return the new article's ID.
 
@@ -176,22 +508,45 @@ def save_new_article(symbol, date, title, content_type, content, url, retrieved_
         retrieved_ts (datetime): datetime when the article was retrieved
 
     Returns:
-        str: ID of the new article record
+        str: ID of the new article record, or None if the symbol already has
+        an article with this title
+    """
+    result = save_new_articles(
+        [(symbol, date, title, content_type, content, url, retrieved_ts)])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+def save_new_articles(articles, queue_summaries: bool=False):
+    """Save a batch of articles in a single transaction.
+
+    Args:
+        articles (list): tuples of (symbol, date, title, content_type,
+            content, url, retrieved_ts), as for save_new_article
+        queue_summaries (bool, optional): also add the saved articles to the
+            summary queue, in the same transaction
+
+    Returns:
+        list: for each article, in order, the new article's ID, None if the
+        symbol already has an article with that title, or the exception
+        that prevented it from being saved
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO investing.press_release
-        (symbol, date, title, content_type, content, url, retrieved_ts)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-        RETURNING id;
-    """, (symbol, date, title, content_type, content, url, retrieved_ts))
-    pr_id = cursor.fetchone()[0]
-    conn.commit()
-    cursor.close()
-    return pr_id
+    if not articles:
+        return []
+    with connection() as conn, conn.cursor() as cursor:
+        results = _insert_many(cursor, "investing.press_release", (
+            "symbol", "date", "title", "content_type", "content", "url",
+            "retrieved_ts",
+        ), articles, conflict=("symbol", "title"))
+        saved = [row for row, result in zip(articles, results) if isinstance(result, int)]
+        _refresh_catalysts(cursor, [(row[0], row[1]) for row in saved])
+        _notify_changed(cursor, "articles", [row[0] for row in saved])
+        if queue_summaries:
+            _enqueue_summary_jobs(cursor, [r for r in results if isinstance(r, int)])
+    return results
 
-def save_new_article_summary(pr_id, category, sentiment, summary, timestamp, model, prompt):
+def save_new_article_summary(pr_id, category, sentiment, summary, timestamp, model, prompt,
+                             content_hash=None):
     """Save a summary for an article to the database.
 
     Args:
@@ -201,19 +556,296 @@ def save_new_article_summary(pr_id, category, sentiment, summary, timestamp, mod
         model (str): name of the model used to summarize the article
         prompt (json): the prompt used to generate the summary, preferably not
             including the article content (use a placeholder instead)
+        content_hash (str, optional): hash identifying the content, prompt and
+            model, so the summary can be reused for identical content
 
     Returns:
         str: ID of the new summary record
     """
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO investing.pr_summary
-        (pr_id, category, sentiment, summary, timestamp, model_used, prompt)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-        RETURNING id;
-    """, (pr_id, category, sentiment, summary, timestamp, model, prompt))
-    summary_id = cursor.fetchone()[0]
-    conn.commit()
-    cursor.close()
-    return summary_id
+    result = save_new_article_summaries(
+        [(pr_id, category, sentiment, summary, timestamp, model, prompt,
+          content_hash)])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+def save_new_article_summaries(summaries):
+    """Save a batch of summaries in a single transaction.
+
+    Args:
+        summaries (list): tuples of (pr_id, category, sentiment, summary,
+            timestamp, model, prompt, content_hash), as for
+            save_new_article_summary
+
+    Returns:
+        list: for each summary, in order, the new summary's ID or the
+        exception that prevented it from being saved
+    """
+    if not summaries:
+        return []
+    with connection() as conn, conn.cursor() as cursor:
+        results = _insert_many(cursor, "investing.pr_summary", (
+            "pr_id", "category", "sentiment", "summary", "timestamp",
+            "model_used", "prompt", "content_hash",
+        ), summaries)
+        # a saved summary completes the article's summary_queue job
+        saved = [row[0] for row, result in zip(summaries, results)
+                 if not isinstance(result, Exception)]
+        if saved:
+            cursor.execute("""
+                DELETE FROM investing.summary_queue
+                WHERE pr_id = ANY(%s);
+            """, (saved,))
+            cursor.execute("""
+                SELECT DISTINCT symbol, date FROM investing.press_release
+                WHERE id = ANY(%s);
+            """, (saved,))
+            days = cursor.fetchall()
+            _refresh_catalysts(cursor, days)
+            _notify_changed(cursor, "articles", [day[0] for day in days])
+    return results
+
+def find_summary_by_hash(content_hash: str):
+    """Find the most recent summary generated for identical content.
+
+    Args:
+        content_hash (str): hash of the normalized content, prompt and model
+
+    Returns:
+        dict: category, sentiment, summary and model_used, or None
+    """
+    with connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT category, sentiment, summary, model_used
+            FROM investing.pr_summary
+            WHERE content_hash = %s
+            ORDER BY timestamp DESC LIMIT 1;
+        """, (content_hash,))
+        row = cursor.fetchone()
+    if row:
+        return {
+            "category": row[0],
+            "sentiment": row[1],
+            "summary": row[2],
+            "model_used": row[3],
+        }
+    return None
+
+def enqueue_summary_jobs(pr_ids) -> int:
+    """Add articles to the summary queue. Articles already queued (including
+    dead-lettered ones) are left alone.
+
+    Args:
+        pr_ids (iterable): IDs of the articles to summarize
+
+    Returns:
+        int: number of articles newly queued
+    """
+    pr_ids = list(pr_ids)
+    if not pr_ids:
+        return 0
+    with connection() as conn, conn.cursor() as cursor:
+        return _enqueue_summary_jobs(cursor, pr_ids)
+
+def _enqueue_summary_jobs(cursor, pr_ids) -> int:
+    pr_ids = [(pr_id,) for pr_id in pr_ids]
+    if not pr_ids:
+        return 0
+    rows = execute_values(cursor, """
+        INSERT INTO investing.summary_queue (pr_id)
+        VALUES %s
+        ON CONFLICT (pr_id) DO NOTHING
+        RETURNING pr_id;
+    """, pr_ids, page_size=len(pr_ids), fetch=True)
+    return len(rows)
+
+def lease_summary_jobs(limit: int, lease_seconds: float, worker: str,
+                       max_attempts: int) -> tuple:
+    """Claim up to limit queued articles for summarization.
+
+    Uses FOR UPDATE SKIP LOCKED, so any number of workers in any number of
+    processes can lease concurrently without handing out the same job.
+    Jobs whose lease has expired (e.g. their worker died) are leased again,
+    unless they have already been leased max_attempts times: a job that
+    keeps killing its worker never reaches fail_summary_job, so those are
+    dead-lettered here instead.
+
+    Args:
+        limit (int): maximum number of jobs to lease
+        lease_seconds (float): how long the worker has before the jobs are
+            offered to someone else
+        worker (str): identifies the worker holding the lease
+        max_attempts (int): leases allowed before a job is dead-lettered
+
+    Returns:
+        tuple: (jobs, dead_lettered) where jobs is a list of (pr_id,
+        attempts, enqueued_at) tuples and dead_lettered the number of
+        exhausted jobs just moved to dead letters
+    """
+    with connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE investing.summary_queue
+            SET status = 'dead',
+                leased_until = NULL,
+                last_error = coalesce(last_error, 'lease expired') || ' (gave up after '
+                    || attempts || ' attempts, last held by '
+                    || coalesce(leased_by, 'unknown') || ')'
+            WHERE pr_id IN (
+                SELECT pr_id FROM investing.summary_queue
+                WHERE status <> 'dead' AND attempts >= %s
+                  AND (status = 'pending' OR leased_until < now())
+                FOR UPDATE SKIP LOCKED
+            );
+        """, (max_attempts,))
+        dead_lettered = cursor.rowcount
+        cursor.execute("""
+            UPDATE investing.summary_queue
+            SET status = 'leased',
+                attempts = attempts + 1,
+                leased_until = now() + make_interval(secs => %s),
+                leased_by = %s
+            WHERE pr_id IN (
+                SELECT pr_id FROM investing.summary_queue
+                WHERE status <> 'dead' AND available_at <= now()
+                  AND (status = 'pending' OR leased_until < now())
+                  AND attempts < %s
+                ORDER BY available_at
+                LIMIT %s
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING pr_id, attempts, enqueued_at;
+        """, (lease_seconds, worker, max_attempts, limit))
+        jobs = cursor.fetchall()
+    return jobs, dead_lettered
+
+def fail_summary_job(pr_id, error: str, max_attempts: int, retry_delay: float) -> str:
+    """Release a failed job for a later retry, or dead-letter it once it has
+    been attempted max_attempts times.
+
+    Args:
+        pr_id (str): ID of the article
+        error (str): description of the failure, kept for inspection
+        max_attempts (int): attempts allowed before the job is dead-lettered
+        retry_delay (float): seconds before the first retry; doubles with
+            each attempt
+
+    Returns:
+        str: the job's new status, 'pending' or 'dead'
+    """
+    with connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            UPDATE investing.summary_queue
+            SET status = CASE WHEN attempts >= %s THEN 'dead' ELSE 'pending' END,
+                available_at = now() + make_interval(
+                    secs => %s * power(2, greatest(attempts - 1, 0))),
+                leased_until = NULL,
+                leased_by = NULL,
+                last_error = %s
+            WHERE pr_id = %s
+            RETURNING status;
+        """, (max_attempts, retry_delay, error, pr_id))
+        row = cursor.fetchone()
+    return row[0] if row else None
+
+def get_summary_queue_depth() -> dict:
+    """Count summary queue jobs by status."""
+    with connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT status, count(*)
+            FROM investing.summary_queue
+            GROUP BY status;
+        """)
+        counts = dict(cursor.fetchall())
+    return {status: counts.get(status, 0) for status in ("pending", "leased", "dead")}
+
+def get_price_history(symbols, start):
+    """Get stored daily bars for the given symbols.
+
+    Args:
+        symbols (list): stock symbols
+        start (datetime.date): earliest date to return
+
+    Returns:
+        list: (symbol, date, open, high, low, close, volume) tuples ordered
+        by symbol and date
+    """
+    with connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT symbol, date, open, high, low, close, volume
+            FROM investing.price_history
+            WHERE symbol = ANY(%s) AND date >= %s
+            ORDER BY symbol, date;
+        """, (list(symbols), start))
+        rows = cursor.fetchall()
+    return rows
+
+def get_price_extents(symbols) -> dict:
+    """Get the first and last stored bar dates for each symbol, and the close
+    of the last bar.
+
+    Returns:
+        dict: symbol -> (first date, last date, last close), for symbols with
+        any stored bars
+    """
+    with connection() as conn, conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT s.symbol, f.date, l.date, l.close
+            FROM unnest(%s::text[]) AS s(symbol)
+            CROSS JOIN LATERAL (
+                SELECT date FROM investing.price_history
+                WHERE symbol = s.symbol ORDER BY date LIMIT 1
+            ) f
+            CROSS JOIN LATERAL (
+                SELECT date, close FROM investing.price_history
+                WHERE symbol = s.symbol ORDER BY date DESC LIMIT 1
+            ) l;
+        """, (list(symbols),))
+        extents = {row[0]: row[1:] for row in cursor.fetchall()}
+    return extents
+
+def _upsert_bars(cursor, bars):
+    execute_values(cursor, """
+        INSERT INTO investing.price_history
+        (symbol, date, open, high, low, close, volume)
+        VALUES %s
+        ON CONFLICT (symbol, date) DO UPDATE SET
+            open = EXCLUDED.open, high = EXCLUDED.high,
+            low = EXCLUDED.low, close = EXCLUDED.close,
+            volume = EXCLUDED.volume;
+    """, bars, page_size=1000)
+
+def save_price_history(bars) -> int:
+    """Insert or update daily bars.
+
+    Args:
+        bars (list): (symbol, date, open, high, low, close, volume) tuples
+
+    Returns:
+        int: number of bars written
+    """
+    if not bars:
+        return 0
+    with connection() as conn, conn.cursor() as cursor:
+        _upsert_bars(cursor, bars)
+        _notify_changed(cursor, "prices", [bar[0] for bar in bars])
+    return len(bars)
+
+def replace_price_history(symbols, bars) -> int:
+    """Replace every stored bar of the given symbols, e.g. once a split or
+    dividend has changed the adjusted history, in one transaction.
+
+    Args:
+        symbols (list): stock symbols whose stored bars are deleted
+        bars (list): (symbol, date, open, high, low, close, volume) tuples
+            to store in their place
+
+    Returns:
+        int: number of bars written
+    """
+    with connection() as conn, conn.cursor() as cursor:
+        cursor.execute("DELETE FROM investing.price_history WHERE symbol = ANY(%s);",
+                       (list(symbols),))
+        if bars:
+            _upsert_bars(cursor, bars)
+        _notify_changed(cursor, "prices", symbols)
+    return len(bars)
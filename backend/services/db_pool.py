@@ -0,0 +1,217 @@
+"""Thread-safe pool of reusable database connections.
+
+A single pool is shared by everything running in the process (monitor threads,
+the summarizer and the Flask workers). Connections are checked out with the
+``connection()`` context manager, which always returns them to the pool.
+"""
+from contextlib import contextmanager
+import logging
+import threading
+import time
+
+import psycopg2
+import psycopg2.extensions
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available within the checkout timeout."""
+
+
+class ConnectionPool:
+    """A bounded pool of psycopg2 connections.
+
+    Args:
+        connect (callable): factory returning a new psycopg2 connection
+        min_size (int): number of connections opened up front
+        max_size (int): maximum number of connections open at once
+        timeout (float): seconds to wait for a free connection before
+            raising PoolTimeout
+        health_check_interval (float): connections idle for longer than this
+            many seconds are pinged with ``SELECT 1`` before being handed out
+    """
+
+    def __init__(self, connect, min_size=1, max_size=10, timeout=30.0,
+                 health_check_interval=60.0):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self._connect = connect
+        self.min_size = min(min_size, max_size)
+        self.max_size = max_size
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+
+        self._lock = threading.Condition()
+        self._idle = []  # list of (connection, returned_at) tuples
+        self._size = 0
+        self._closed = False
+
+        self._checkouts = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._hold_total = 0.0
+        self._hold_max = 0.0
+        self._timeouts = 0
+        self._discarded = 0
+
+        for _ in range(self.min_size):
+            self._idle.append((self._open(), time.monotonic()))
+
+    def _open(self):
+        conn = self._connect()
+        self._size += 1
+        return conn
+
+    def _discard(self, conn):
+        self._size -= 1
+        self._discarded += 1
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def _is_healthy(self, conn, idle_since):
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute("SELECT 1;")
+            conn.rollback()
+            return True
+        except Exception as e:
+            logger.warning(f"Discarding unhealthy connection: {e}")
+            return False
+
+    def getconn(self):
+        """Check out a connection, blocking until one is available.
+
+        Prefer the ``connection()`` context manager, which guarantees the
+        connection is returned.
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        while True:
+            candidate = self._reserve(deadline)
+            if candidate is None:
+                break
+            conn, idle_since = candidate
+            # pinged outside the lock: a half-open connection can block until
+            # the socket times out, and must not stall every other checkout
+            if self._is_healthy(conn, idle_since):
+                with self._lock:
+                    return self._record_checkout(conn, started)
+            with self._lock:
+                self._discard(conn)
+        try:
+            conn = self._connect()
+        except Exception:
+            with self._lock:
+                self._size -= 1
+                self._lock.notify()
+            raise
+        with self._lock:
+            return self._record_checkout(conn, started)
+
+    def _reserve(self, deadline):
+        """Wait for an idle connection or a free slot.
+
+        Returns:
+            tuple: (connection, idle_since) popped from the idle list, or None
+            when a slot was reserved for a new connection to be opened
+            outside the lock
+        """
+        with self._lock:
+            while True:
+                if self._closed:
+                    raise psycopg2.InterfaceError("connection pool is closed")
+                if self._idle:
+                    return self._idle.pop()
+                if self._size < self.max_size:
+                    self._size += 1
+                    return None
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f"no connection available after {self.timeout}s "
+                        f"({self._size} in use)"
+                    )
+                self._lock.wait(remaining)
+
+    def _record_checkout(self, conn, started):
+        waited = time.monotonic() - started
+        self._checkouts += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        return conn
+
+    def putconn(self, conn, held_for=0.0):
+        """Return a connection to the pool, resetting any open transaction."""
+        status = None
+        if not conn.closed:
+            try:
+                status = conn.get_transaction_status()
+                if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+                    status = conn.get_transaction_status()
+            except Exception:
+                status = None
+        with self._lock:
+            self._hold_total += held_for
+            self._hold_max = max(self._hold_max, held_for)
+            if (self._closed or status != psycopg2.extensions.TRANSACTION_STATUS_IDLE):
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._lock.notify()
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection for the duration of a ``with`` block.
+
+        The transaction is committed when the block exits normally and rolled
+        back if it raises. Either way the connection goes back to the pool.
+        """
+        conn = self.getconn()
+        checked_out = time.monotonic()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            self.putconn(conn, time.monotonic() - checked_out)
+
+    def stats(self) -> dict:
+        """Return a snapshot of pool size and checkout metrics."""
+        with self._lock:
+            checkouts = self._checkouts
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._size - len(self._idle),
+                "max_size": self.max_size,
+                "checkouts": checkouts,
+                "timeouts": self._timeouts,
+                "discarded": self._discarded,
+                "wait_avg": self._wait_total / checkouts if checkouts else 0.0,
+                "wait_max": self._wait_max,
+                "hold_avg": self._hold_total / checkouts if checkouts else 0.0,
+                "hold_max": self._hold_max,
+            }
+
+    def close(self):
+        """Close all idle connections and refuse further checkouts."""
+        with self._lock:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._lock.notify_all()
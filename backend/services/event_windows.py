@@ -0,0 +1,171 @@
+"""How prices and volume move around news releases.
+
+Each release is aligned to the first trading session on or after its date
+(day 0) with merge_asof. For every window (start, end) in trading days
+relative to day 0 it then computes:
+
+* ret: the simple return from the close before the window starts to the
+  close on its last day;
+* abn: the abnormal return, i.e. ret less the return expected over the
+  window. That is the benchmark's return over the same sessions when a
+  benchmark is given. Otherwise it is the symbol's own mean daily return
+  over an estimation window before the event;
+* vol: the window's mean volume as a multiple of the mean volume over the
+  lookback before day 0.
+
+Everything works on flat NumPy arrays over all symbols at once, so a
+whole watchlist and years of history are handled in one pass without a
+Python loop per release.
+"""
+import datetime
+
+import numpy as np
+import pandas as pd
+
+from services import db
+
+# (start, end) trading days relative to the release session, inclusive
+DEFAULT_WINDOWS = ((-1, 1), (0, 1), (0, 5))
+DEFAULT_ESTIMATION = (-60, -11)
+DEFAULT_VOLUME_LOOKBACK = 20
+
+def window_label(window: tuple) -> str:
+    return f"{window[0]:+d}_{window[1]:+d}"
+
+def _at(values: np.ndarray, row: np.ndarray, pos: np.ndarray, size: np.ndarray,
+        offset: int) -> np.ndarray:
+    """values[row + offset], or NaN where that falls outside the row's symbol."""
+    target = pos + offset
+    valid = (row >= 0) & (target >= 0) & (target < size)
+    result = np.full(len(row), np.nan)
+    result[valid] = values[row[valid] + offset]
+    return result
+
+def _window_mean(cum: np.ndarray, row: np.ndarray, pos: np.ndarray, size: np.ndarray,
+                 start: int, end: int) -> np.ndarray:
+    """Mean of values[row + start .. row + end] given cum, the cumulative sum
+    of values with a leading zero, or NaN where that leaves the row's symbol."""
+    valid = (row >= 0) & (pos + start >= 0) & (pos + end < size)
+    result = np.full(len(row), np.nan)
+    result[valid] = (cum[row[valid] + end + 1] - cum[row[valid] + start]) / (end - start + 1)
+    return result
+
+def event_windows(prices: pd.DataFrame, events: pd.DataFrame, windows=DEFAULT_WINDOWS,
+                  benchmark: pd.Series=None, estimation: tuple=DEFAULT_ESTIMATION,
+                  volume_lookback: int=DEFAULT_VOLUME_LOOKBACK,
+                  max_gap_days: int=5) -> pd.DataFrame:
+    """Compute window returns and volume multiples for every event.
+
+    Args:
+        prices (DataFrame): daily bars with symbol, date, close and volume
+            columns, any number of symbols
+        events (DataFrame): symbol and date columns, plus anything else to
+            carry through to the result
+        windows (iterable, optional): (start, end) trading-day windows
+        benchmark (Series, optional): benchmark closes indexed by date. if
+            given, abnormal returns are market-adjusted; otherwise they are
+            mean-adjusted over the estimation window
+        estimation (tuple, optional): (start, end) trading days before the
+            event used to estimate the mean daily return
+        volume_lookback (int, optional): sessions before day 0 that volume
+            multiples are measured against
+        max_gap_days (int, optional): events with no session within this
+            many calendar days get NaN results
+
+    Returns:
+        DataFrame: the events in their original order, with session_date
+        and ret_, abn_ and vol_ columns per window labelled like ``-1_+1``.
+        values needing bars outside the available history are NaN
+    """
+    prices = (prices.dropna(subset=["close"])
+              .sort_values(["symbol", "date"], kind="stable")
+              .reset_index(drop=True))
+    prices["date"] = pd.to_datetime(prices["date"]).astype("datetime64[ns]")
+    groups = prices.groupby("symbol", sort=False)
+    pos = groups.cumcount().to_numpy()
+    size = groups["close"].transform("size").to_numpy()
+    log_close = np.log(prices["close"].to_numpy(dtype=np.float64))
+    volume = prices["volume"].to_numpy(dtype=np.float64)
+    cum_volume = np.concatenate([[0.0], np.nancumsum(volume)])
+
+    sessions = pd.DataFrame({
+        "symbol": prices["symbol"],
+        "session_date": prices["date"],
+        "_row": np.arange(len(prices)),
+    })
+    left = events.reset_index(drop=True).assign(
+        _order=np.arange(len(events)), _date=pd.to_datetime(events["date"].to_numpy()).astype("datetime64[ns]"))
+    aligned = pd.merge_asof(
+        left.sort_values("_date", kind="stable"), sessions.sort_values("session_date"),
+        left_on="_date", right_on="session_date", by="symbol",
+        direction="forward", tolerance=pd.Timedelta(days=max_gap_days),
+    ).sort_values("_order")
+    row = aligned["_row"].fillna(-1).to_numpy(dtype=np.int64)
+    matched = row >= 0
+    event_pos = np.where(matched, pos[np.maximum(row, 0)], -1)
+    event_size = np.where(matched, size[np.maximum(row, 0)], 0)
+
+    if benchmark is not None:
+        bench = benchmark.sort_index()
+        bench.index = pd.to_datetime(bench.index).astype("datetime64[ns]")
+        bench = bench.reindex(prices["date"], method="ffill")
+        log_expected = np.log(bench.to_numpy(dtype=np.float64))
+    else:
+        e_start, e_end = estimation
+        mean_daily = ((_at(log_close, row, event_pos, event_size, e_end)
+                       - _at(log_close, row, event_pos, event_size, e_start - 1))
+                      / (e_end - e_start + 1))
+
+    lookback_volume = _window_mean(cum_volume, row, event_pos, event_size,
+                                   -volume_lookback, -1)
+
+    result = aligned.drop(columns=["_order", "_date", "_row"]).reset_index(drop=True)
+    for window in windows:
+        start, end = window
+        label = window_label(window)
+        log_return = (_at(log_close, row, event_pos, event_size, end)
+                      - _at(log_close, row, event_pos, event_size, start - 1))
+        if benchmark is not None:
+            expected = (_at(log_expected, row, event_pos, event_size, end)
+                        - _at(log_expected, row, event_pos, event_size, start - 1))
+        else:
+            expected = mean_daily * (end - start + 1)
+        window_volume = _window_mean(cum_volume, row, event_pos, event_size, start, end)
+        result[f"ret_{label}"] = np.expm1(log_return)
+        result[f"abn_{label}"] = np.expm1(log_return) - np.expm1(expected)
+        result[f"vol_{label}"] = window_volume / lookback_volume
+    return result
+
+def load_prices(symbols, start: datetime.date) -> pd.DataFrame:
+    """Stored daily bars for many symbols as one long frame."""
+    return pd.DataFrame(db.get_price_history(symbols, start),
+                        columns=["symbol", "date", "open", "high", "low", "close", "volume"])
+
+def load_events(symbols, start: datetime.date=None) -> pd.DataFrame:
+    """News days for many symbols, one row per symbol and day."""
+    return pd.DataFrame(db.get_catalyst_days(symbols, start),
+                        columns=["symbol", "date", "article_count", "positive_count",
+                                 "negative_count"])
+
+def study_watchlist(windows=DEFAULT_WINDOWS, days: int=365, benchmark_symbol: str=None,
+                    **kwargs) -> pd.DataFrame:
+    """Run event_windows over every watched symbol's stored history.
+
+    Args:
+        windows (iterable, optional): (start, end) trading-day windows
+        days (int, optional): calendar days of history to use
+        benchmark_symbol (str, optional): symbol whose stored closes to use
+            as the benchmark, e.g. an index ETF
+
+    Returns:
+        DataFrame: see event_windows
+    """
+    symbols = [s.upper() for s in db.get_watch_list()]
+    start = datetime.date.today() - datetime.timedelta(days=days)
+    prices = load_prices(symbols, start)
+    benchmark = None
+    if benchmark_symbol:
+        bench = load_prices([benchmark_symbol.upper()], start)
+        benchmark = bench.set_index("date")["close"]
+    return event_windows(prices, load_events(symbols, start), windows,
+                         benchmark=benchmark, **kwargs)
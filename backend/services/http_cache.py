@@ -0,0 +1,76 @@
+"""Persistent cache of HTTP validators for conditional requests.
+
+For each URL we remember the ETag and Last-Modified headers of the last
+processed response along with a hash of its body, so unchanged pages can be
+recognised without parsing them again.
+"""
+import json
+import logging
+import os
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_PATH = os.path.join(os.getcwd(), "cache", "http_validators.json")
+
+
+class ValidatorCache:
+    """Thread-safe map of URL -> validators, persisted to a JSON file.
+
+    Args:
+        path (str): location of the JSON file
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = {}
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable validator cache {path}: {e}")
+
+    def get(self, url: str) -> dict:
+        """Get the stored validators for url, or an empty dict."""
+        with self._lock:
+            return dict(self._entries.get(url, {}))
+
+    def conditional_headers(self, url: str) -> dict:
+        """Build If-None-Match/If-Modified-Since headers for url."""
+        entry = self.get(url)
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def update(self, url: str, etag: str=None, last_modified: str=None,
+               content_hash: str=None):
+        """Store new validators for url and write the cache to disk."""
+        with self._lock:
+            self._entries[url] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "content_hash": content_hash,
+            }
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self._entries, f)
+            os.replace(tmp_path, self.path)
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_validator_cache() -> ValidatorCache:
+    """Return the process-wide validator cache (path from HTTP_CACHE_PATH)."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ValidatorCache(os.getenv("HTTP_CACHE_PATH", DEFAULT_CACHE_PATH))
+    return _cache
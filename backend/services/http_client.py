@@ -0,0 +1,81 @@
+"""Process-wide HTTP client with pooled, keep-alive connections.
+
+All threads share one HTTPAdapter, and with it urllib3's per-host
+connection pools, so repeated requests to the same IR platform reuse open
+connections. Each thread gets its own Session on top of the shared adapter
+because Sessions themselves are not thread-safe.
+
+Configuration (environment variables):
+    HTTP_POOL_HOSTS: number of hosts to keep connection pools for (20)
+    HTTP_POOL_SIZE: connections kept open per host (10)
+    HTTP_RETRIES: retries on connection errors, 429 and 5xx responses (3)
+    HTTP_BACKOFF_FACTOR: exponential backoff base in seconds (0.5)
+    HTTP_BACKOFF_JITTER: maximum random jitter added to each backoff (0.5)
+    HTTP_CONNECT_TIMEOUT / HTTP_READ_TIMEOUT: default timeouts (10 / 30)
+    HTTP_USER_AGENT: User-Agent header sent with every request
+"""
+import logging
+import os
+import threading
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_adapter = None
+_adapter_lock = threading.Lock()
+_local = threading.local()
+
+def _get_adapter() -> HTTPAdapter:
+    global _adapter
+    if _adapter is None:
+        with _adapter_lock:
+            if _adapter is None:
+                retry = Retry(
+                    total=int(os.getenv("HTTP_RETRIES", "3")),
+                    backoff_factor=float(os.getenv("HTTP_BACKOFF_FACTOR", "0.5")),
+                    backoff_jitter=float(os.getenv("HTTP_BACKOFF_JITTER", "0.5")),
+                    status_forcelist=RETRY_STATUSES,
+                    allowed_methods=frozenset({"GET", "HEAD"}),
+                    respect_retry_after_header=True,
+                    raise_on_status=False,
+                )
+                _adapter = HTTPAdapter(
+                    pool_connections=int(os.getenv("HTTP_POOL_HOSTS", "20")),
+                    pool_maxsize=int(os.getenv("HTTP_POOL_SIZE", "10")),
+                    max_retries=retry,
+                )
+    return _adapter
+
+def get_session() -> requests.Session:
+    """Return this thread's Session, backed by the shared connection pools."""
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        adapter = _get_adapter()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if os.getenv("HTTP_USER_AGENT"):
+            session.headers["User-Agent"] = os.getenv("HTTP_USER_AGENT")
+        _local.session = session
+    return session
+
+def get_timeout() -> tuple:
+    """Return the default (connect, read) timeout in seconds."""
+    return (
+        float(os.getenv("HTTP_CONNECT_TIMEOUT", "10")),
+        float(os.getenv("HTTP_READ_TIMEOUT", "30")),
+    )
+
+def get(url: str, **kwargs) -> requests.Response:
+    """Send a GET request through the shared client.
+
+    Accepts the same keyword arguments as requests.get; timeout defaults to
+    get_timeout().
+    """
+    kwargs.setdefault("timeout", get_timeout())
+    return get_session().get(url, **kwargs)
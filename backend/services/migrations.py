@@ -0,0 +1,167 @@
+"""Versioned schema migrations for the investing schema.
+
+Migrations are the SQL files in backend/migrations named NNNN_description.sql.
+Each is applied once, in version order, in its own transaction along with
+its row in investing.schema_migrations. Apply pending migrations from the
+backend directory with:
+
+    python -m services.migrations
+    python -m services.migrations --status
+"""
+import argparse
+import hashlib
+import logging
+import os
+import re
+
+from services import db
+
+logger = logging.getLogger(__name__)
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                              "migrations")
+_FILENAME = re.compile(r"^(?P<version>\d{4})_(?P<name>\w+)\.sql$")
+# arbitrary key for pg_advisory_lock, so two runners never interleave
+_LOCK_KEY = 0x70686d77
+
+
+class Migration:
+    """A migration file.
+
+    Args:
+        version (int): position in the migration order
+        name (str): description taken from the file name
+        path (str): location of the SQL file
+    """
+
+    def __init__(self, version: int, name: str, path: str):
+        self.version = version
+        self.name = name
+        self.path = path
+
+    def read(self) -> str:
+        with open(self.path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def checksum(self) -> str:
+        return hashlib.sha256(self.read().encode("utf-8")).hexdigest()
+
+
+def discover(path: str=MIGRATIONS_DIR) -> list:
+    """List the migrations in path, ordered by version.
+
+    Raises:
+        ValueError: if a .sql file is misnamed or two share a version
+    """
+    migrations = {}
+    for filename in sorted(os.listdir(path)):
+        if not filename.endswith(".sql"):
+            continue
+        match = _FILENAME.match(filename)
+        if not match:
+            raise ValueError(f"Migration file {filename} is not named NNNN_description.sql")
+        version = int(match.group("version"))
+        if version in migrations:
+            raise ValueError(f"Migrations {migrations[version].path} and {filename} "
+                             f"share version {version}")
+        migrations[version] = Migration(version, match.group("name"),
+                                        os.path.join(path, filename))
+    return [migrations[v] for v in sorted(migrations)]
+
+def _ensure_table(cursor):
+    cursor.execute("""
+        CREATE SCHEMA IF NOT EXISTS investing;
+        CREATE TABLE IF NOT EXISTS investing.schema_migrations (
+            version integer PRIMARY KEY,
+            name text NOT NULL,
+            checksum text NOT NULL,
+            applied_at timestamptz NOT NULL DEFAULT now()
+        );
+    """)
+
+def _applied(cursor) -> dict:
+    cursor.execute("SELECT version, checksum FROM investing.schema_migrations;")
+    return dict(cursor.fetchall())
+
+def status(path: str=MIGRATIONS_DIR) -> list:
+    """Report each migration and whether it has been applied.
+
+    Returns:
+        list: (version, name, state) tuples, state being "applied",
+        "pending" or "modified" (applied, but the file has changed since)
+    """
+    with db.connection() as conn, conn.cursor() as cursor:
+        _ensure_table(cursor)
+        applied = _applied(cursor)
+    report = []
+    for migration in discover(path):
+        if migration.version not in applied:
+            state = "pending"
+        elif applied[migration.version] != migration.checksum():
+            state = "modified"
+        else:
+            state = "applied"
+        report.append((migration.version, migration.name, state))
+    return report
+
+def migrate(target: int=None, path: str=MIGRATIONS_DIR) -> list:
+    """Apply pending migrations up to and including target (default: all).
+
+    Runs on its own connection holding an advisory lock, so concurrent
+    runners apply each migration once. A failing migration is rolled back
+    and stops the run; the ones before it stay applied.
+
+    Returns:
+        list: versions applied by this run
+    """
+    conn = db.get_connection()
+    try:
+        with conn.cursor() as cursor:
+            cursor.execute("SELECT pg_advisory_lock(%s);", (_LOCK_KEY,))
+            _ensure_table(cursor)
+            conn.commit()
+            applied = _applied(cursor)
+            done = []
+            for migration in discover(path):
+                if target is not None and migration.version > target:
+                    break
+                if migration.version in applied:
+                    if applied[migration.version] != migration.checksum():
+                        logger.warning(f"Migration {migration.version:04d}_{migration.name} "
+                                       f"was modified after it was applied")
+                    continue
+                logger.info(f"Applying migration {migration.version:04d}_{migration.name}")
+                try:
+                    cursor.execute(migration.read())
+                    cursor.execute("""
+                        INSERT INTO investing.schema_migrations (version, name, checksum)
+                        VALUES (%s, %s, %s);
+                    """, (migration.version, migration.name, migration.checksum()))
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    logger.error(f"Migration {migration.version:04d}_{migration.name} failed")
+                    raise
+                done.append(migration.version)
+            cursor.execute("SELECT pg_advisory_unlock(%s);", (_LOCK_KEY,))
+            conn.commit()
+    finally:
+        conn.close()
+    logger.info(f"Applied {len(done)} migrations" if done else "Schema is up to date")
+    return done
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s:%(name)s: %(message)s")
+    parser = argparse.ArgumentParser(description="Apply schema migrations.")
+    parser.add_argument("--target", type=int, help="stop after this version")
+    parser.add_argument("--status", action="store_true",
+                        help="list migrations and whether they are applied")
+    args = parser.parse_args()
+    if args.status:
+        for version, name, state in status():
+            print(f"{version:04d}  {state:<8}  {name}")
+    else:
+        migrate(args.target)
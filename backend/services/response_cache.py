@@ -0,0 +1,251 @@
+"""In-memory cache of API responses, invalidated when the data changes.
+
+Responses are kept per (kind, symbol), where kind is "articles" or
+"prices", in an LRU bounded by total body size. Writers in services.db send
+a Postgres NOTIFY on db.INVALIDATION_CHANNEL when they commit, and a
+listener thread drops the matching entries, so writes made by the monitor
+and summarizer processes reach the API process too.
+"""
+from collections import OrderedDict
+import logging
+import os
+import select
+import threading
+import time
+
+import psycopg2
+
+from services import db
+
+logger = logging.getLogger(__name__)
+
+
+class CachedResponse:
+    """A complete response body with the headers needed to replay it."""
+
+    def __init__(self, body: bytes, mimetype: str, headers: dict=None,
+                 expires_at: float=None):
+        self.body = body
+        self.mimetype = mimetype
+        self.headers = dict(headers or {})
+        self.expires_at = expires_at
+
+
+class ResponseCache:
+    """Thread-safe LRU of CachedResponses bounded by total body size.
+
+    Every (kind, symbol) has a generation, which changes when it is
+    invalidated or the whole cache is cleared. Callers read it with
+    generation() before computing a response and pass it back to put(), so
+    a response computed from data that changed while it was being built is
+    never stored.
+
+    Args:
+        max_bytes (int): total size of cached bodies; 0 disables the cache
+        max_entry_bytes (int): largest single body that will be cached
+    """
+
+    def __init__(self, max_bytes: int, max_entry_bytes: int):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self._entries = OrderedDict()  # key -> CachedResponse
+        self._by_symbol = {}  # (kind, symbol) -> set of keys
+        self._generations = {}  # (kind, symbol) -> int
+        self._epoch = 0  # bumped by clear()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "evictions": 0,
+            "expirations": 0,
+            "invalidations": 0,
+            "rejected_too_large": 0,
+        }
+
+    @staticmethod
+    def make_key(kind: str, symbol: str, path: str, args) -> tuple:
+        """Build a key from the request path and query arguments, ignoring
+        argument order."""
+        return (kind, symbol, path, tuple(sorted(args.items(multi=True))))
+
+    def generation(self, kind: str, symbol: str) -> tuple:
+        with self._lock:
+            return (self._epoch, self._generations.get((kind, symbol), 0))
+
+    def get(self, key: tuple) -> CachedResponse:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at is not None \
+                    and entry.expires_at <= time.monotonic():
+                self._remove(key)
+                self._stats["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats["hits"] += 1
+            return entry
+
+    def peek(self, key: tuple) -> CachedResponse:
+        """Like get, but without counting a hit or miss or refreshing recency."""
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is not None and entry.expires_at is not None \
+                and entry.expires_at <= time.monotonic():
+            return None
+        return entry
+
+    def put(self, key: tuple, generation: tuple, entry: CachedResponse) -> bool:
+        """Store entry unless it is too large or its symbol was invalidated
+        since generation was read.
+
+        Returns:
+            bool: True if the entry was stored
+        """
+        if len(entry.body) > self.max_entry_bytes:
+            with self._lock:
+                self._stats["rejected_too_large"] += 1
+            return False
+        kind, symbol = key[0], key[1]
+        with self._lock:
+            if (self._epoch, self._generations.get((kind, symbol), 0)) != generation:
+                return False
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = entry
+            self._by_symbol.setdefault((kind, symbol), set()).add(key)
+            self._size += len(entry.body)
+            self._stats["stores"] += 1
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self._stats["evictions"] += 1
+        return True
+
+    def invalidate(self, kind: str, symbol: str) -> int:
+        """Drop every response cached for symbol.
+
+        Returns:
+            int: number of entries removed
+        """
+        with self._lock:
+            self._generations[(kind, symbol)] = \
+                self._generations.get((kind, symbol), 0) + 1
+            keys = list(self._by_symbol.get((kind, symbol), ()))
+            for key in keys:
+                self._remove(key)
+            self._stats["invalidations"] += len(keys)
+            return len(keys)
+
+    def clear(self):
+        """Drop everything, e.g. after invalidation notices may have been missed."""
+        with self._lock:
+            self._epoch += 1
+            self._stats["invalidations"] += len(self._entries)
+            self._entries.clear()
+            self._by_symbol.clear()
+            self._size = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._entries)
+            stats["bytes"] = self._size
+            stats["max_bytes"] = self.max_bytes
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else None
+        return stats
+
+    def _remove(self, key: tuple):
+        entry = self._entries.pop(key)
+        self._size -= len(entry.body)
+        keys = self._by_symbol.get(key[:2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_symbol[key[:2]]
+
+
+def listen_for_invalidations(cache: ResponseCache, stop: threading.Event=None):
+    """Apply invalidation notices to cache until stop is set.
+
+    Runs on its own unpooled connection, since LISTEN ties up a session.
+    After connecting (or reconnecting) the whole cache is cleared, as any
+    notices sent while not listening were lost. Reconnect attempts back off
+    up to RESPONSE_CACHE_LISTEN_BACKOFF seconds (default 60).
+    """
+    stop = stop or threading.Event()
+    max_backoff = float(os.getenv("RESPONSE_CACHE_LISTEN_BACKOFF", "60"))
+    backoff = 1
+    while not stop.is_set():
+        conn = None
+        try:
+            conn = db.get_connection()
+            conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+            with conn.cursor() as cursor:
+                cursor.execute(f"LISTEN {db.INVALIDATION_CHANNEL};")
+            cache.clear()
+            _listener_state["connected"] = True
+            logger.info(f"Listening for cache invalidations on {db.INVALIDATION_CHANNEL}")
+            backoff = 1
+            while not stop.is_set():
+                if select.select([conn], [], [], 30) == ([], [], []):
+                    # a dropped connection would otherwise go unnoticed
+                    with conn.cursor() as cursor:
+                        cursor.execute("SELECT 1;")
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    notice = conn.notifies.pop(0)
+                    kind, _, symbol = notice.payload.partition(":")
+                    removed = cache.invalidate(kind, symbol)
+                    logger.debug(f"Invalidated {removed} cached {kind} responses for {symbol}")
+        except Exception as e:
+            _listener_state["connected"] = False
+            logger.error(f"{type(e).__name__} in cache invalidation listener: {e}; "
+                         f"reconnecting in {backoff}s")
+            stop.wait(backoff)
+            backoff = min(backoff * 2, max_backoff)
+        finally:
+            _listener_state["connected"] = False
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+_cache = None
+_cache_lock = threading.Lock()
+_listener_state = {"connected": False}
+
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache, sized by
+    RESPONSE_CACHE_MAX_BYTES (default 64MB) and RESPONSE_CACHE_MAX_ENTRY_BYTES
+    (default 4MB), starting its invalidation listener on first use.
+
+    Without a listener the cache could serve stale data indefinitely, so
+    nothing is stored while it is not connected.
+    """
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResponseCache(
+                    int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+                    int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", str(4 * 1024 * 1024))),
+                )
+                if _cache.max_bytes > 0:
+                    threading.Thread(target=listen_for_invalidations, args=(_cache,),
+                                     name="response-cache-listener", daemon=True).start()
+    return _cache
+
+def is_active() -> bool:
+    """Whether responses may be cached: enabled and listening for changes."""
+    return get_response_cache().max_bytes > 0 and _listener_state["connected"]
+
+def get_stats() -> dict:
+    stats = get_response_cache().stats()
+    stats["listening"] = _listener_state["connected"]
+    return stats
@@ -1,5 +1,7 @@
 from dotenv import load_dotenv
 import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
 
 from services import db, StockDataService
 import datetime
@@ -9,30 +11,23 @@ load_dotenv()
 
 def plot_with_news(symbol: str):
     price_history = StockDataService.fetch_price_history(symbol)[symbol.upper()]
-    news_titles = db.get_titles_for_symbol(symbol.upper())
-    # build a mapping from date -> list of titles and sentiments (normalize to date objects)
-    title_map = {}
-    sentiment_map = {}
-    for title, d in news_titles:
-        if hasattr(d, 'date'):
-            key = d.date()
-        else:
-            # assume it's already a date
-            key = d
-        title_map.setdefault(key, []).append(title)
-        # get sentiment
-        article = db.get_article_with_summary(symbol.upper(), title)
-        sentiment = article['sentiment'] if article else None
-        sentiment_map.setdefault(key, []).append(sentiment)
-    catalysts = {d: True for _, d in news_titles}
+    catalysts = load_catalysts(symbol)
+    title_map = dict(zip(catalysts.index.date, catalysts['titles']))
     print(f"Found {len(catalysts)} catalyst dates for {symbol}")
-    price_history.insert(len(price_history.columns), 'Catalyst', price_history.index.map(catalysts).fillna(False))
+    price_history.insert(len(price_history.columns), 'Catalyst', price_history.index.isin(catalysts.index))
     plt.figure()
     plot_price_history(price_history)
     plot_volume_history(price_history)
-    plot_catalyst_dates(price_history, title_map, sentiment_map)
+    plot_catalyst_dates(price_history, title_map, catalysts)
     plt.show()
 
+def load_catalysts(symbol: str) -> pd.DataFrame:
+    """Per-day news rollup for symbol, indexed by date."""
+    catalysts = pd.DataFrame(db.get_catalysts(symbol.upper()),
+                             columns=['date', 'article_count', 'positive_count',
+                                      'negative_count', 'neutral_count', 'titles'])
+    return catalysts.set_index(pd.DatetimeIndex(pd.to_datetime(catalysts.pop('date'))))
+
 def plot_price_history(dataFrame):
     up = dataFrame[dataFrame.Close >= dataFrame.Open]
     down = dataFrame[dataFrame.Close < dataFrame.Open]
@@ -60,7 +55,7 @@ def plot_volume_history(data):
     plt.bar(data.index, chart10 * data.Volume / maxVolume, 0.9, bottom=chartZero, color="blue")
 
 
-def plot_catalyst_dates(data, title_map=None, sentiment_map=None):
+def plot_catalyst_dates(data, title_map=None, catalysts=None):
     top = data.High.max()
     bottom = data.Low.min()
     height = (top - bottom)
@@ -69,19 +64,12 @@ def plot_catalyst_dates(data, title_map=None, sentiment_map=None):
     ax = plt.gca()
     
     # Determine colors based on sentiment
-    colors = []
-    for idx in news_dates.index:
-        try:
-            date_key = idx.date()
-        except Exception:
-            date_key = idx
-        sentiments = sentiment_map.get(date_key, []) if sentiment_map else []
-        if any(s and s.lower() == 'positive' for s in sentiments):
-            colors.append('green')
-        elif any(s and s.lower() == 'negative' for s in sentiments):
-            colors.append('red')
-        else:
-            colors.append('#999999')  # neutral color
+    if catalysts is not None:
+        days = catalysts.reindex(news_dates.index)
+        colors = np.select([days.positive_count.gt(0), days.negative_count.gt(0)],
+                           ['green', 'red'], '#999999')  # neutral color
+    else:
+        colors = '#999999'
     
     bars = ax.bar(news_dates.index, height, 0.95, bottom=bottom, color=colors, alpha=0.44)
 
@@ -48,34 +48,38 @@ export default function Home() {
     if (!symbol) return;
     setLoading(true);
     try {
-      const [priceResponse, articlesResponse] = await Promise.all([
-        fetch(`/api/price-history/${symbol}`),
+      const [priceResponse, catalystsResponse, articlesResponse] = await Promise.all([
+        fetch(`/api/price-history/${symbol}?format=columnar`),
+        fetch(`/api/catalysts/${symbol}`),
         fetch(`/api/articles/${symbol}`),
       ]);
-      if (!priceResponse.ok || !articlesResponse.ok) throw new Error('Failed to fetch');
+      if (!priceResponse.ok || !catalystsResponse.ok || !articlesResponse.ok) throw new Error('Failed to fetch');
       const data = await priceResponse.json();
+      const catalystDays = await catalystsResponse.json();
       const articles = await articlesResponse.json();
-      const catalystMap = articles.reduce((acc: any, article: any) => {
-        const dateStr = new Date(article.date).toISOString().split('T')[0];
-        if (!acc[dateStr]) acc[dateStr] = { sentiments: [], titles: [], articles: [] };
-        acc[dateStr].sentiments.push(article.sentiment);
-        acc[dateStr].titles.push(article.title);
-        acc[dateStr].articles.push(article);
+      const catalystMap = catalystDays.reduce((acc: any, day: any) => {
+        const dateStr = new Date(day.date).toISOString().split('T')[0];
+        acc[dateStr] = { ...day, articles: [] };
         return acc;
       }, {});
+      for (const article of articles) {
+        const dateStr = new Date(article.date).toISOString().split('T')[0];
+        catalystMap[dateStr]?.articles.push(article);
+      }
       const catalystDates = Object.keys(catalystMap).map(d => new Date(d));
       setCatalysts(catalystDates);
       setCatalystMap(catalystMap);
-      const candlestickData = data.map((item: any) => ({
-        x: new Date(item.Date).getTime(),
-        o: item.Open,
-        h: item.High,
-        l: item.Low,
-        c: item.Close,
+      const times: number[] = data.date.map((day: number) => day * 86400000);
+      const candlestickData = times.map((x, i) => ({
+        x,
+        o: data.open[i],
+        h: data.high[i],
+        l: data.low[i],
+        c: data.close[i],
       }));
-      const volumeData = data.map((item: any) => ({
-        x: new Date(item.Date).getTime(),
-        y: item.Volume,
+      const volumeData = times.map((x, i) => ({
+        x,
+        y: data.volume[i],
       }));
       setChartData({
         datasets: [
@@ -162,10 +166,8 @@ export default function Home() {
       annotation: {
         annotations: Object.entries(catalystMap).reduce((acc: any, [dateStr, data]: [string, any], index: number) => {
           const date = new Date(dateStr);
-          const { sentiments, titles } = data;
-          const hasPositive = sentiments.some((s: string) => s && s.toLowerCase() === 'positive');
-          const hasNegative = sentiments.some((s: string) => s && s.toLowerCase() === 'negative');
-          const color = hasPositive ? 'green' : hasNegative ? 'red' : 'orange';
+          const { positive_count, negative_count, titles } = data;
+          const color = positive_count > 0 ? 'green' : negative_count > 0 ? 'red' : 'orange';
           acc[`catalyst-${index}`] = {
             type: 'line' as const,
             xMin: date.getTime(),